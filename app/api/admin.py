@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api.auth import require_admin
+
+from ..db import get_db
+from .. import models
+from ..services.calendar_batch import resync_user
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/users/{user_id}/calendar/resync")
+def resync_calendar(
+    user_id: int,
+    since: Optional[datetime] = Query(None, description="Only bookings starting at or after this time"),
+    update_existing: bool = Query(True),
+    db: Session = Depends(get_db),
+):
+    """
+    Batch-syncs the host's bookings to Google Calendar and returns per-action counts.
+    """
+    user = db.get(models.User, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        return resync_user(user_id, since=since, update_existing=update_existing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -4,9 +4,13 @@ from typing import Optional
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from authlib.integrations.starlette_client import OAuth
 import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..db import get_db
-from .. import models
+from starlette.concurrency import run_in_threadpool
+from ..db import AnySession, get_db, get_session
+from .. import config, crud, crud_async, models, schemas
+from ..services.google_tokens import expiry_from_seconds
+from ..services.timezones import is_valid_timezone
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -59,10 +63,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _apply_google_tokens(user: models.User, access_token: str, refresh_token: Optional[str], expiry):
+    user.google_access_token = access_token
+    user.google_token_expiry = expiry
+    if refresh_token:
+        user.google_refresh_token = refresh_token
+    user.google_refresh_failures = 0
+    user.google_refresh_retry_at = None
+
+
+def _store_google_tokens(db: Session, email: str, access_token: str, refresh_token: Optional[str], expiry):
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if not user:
+        user = models.User(email=email)
+        db.add(user)
+    _apply_google_tokens(user, access_token, refresh_token, expiry)
+    db.commit()
+    return user
+
 @router.post("/login/google")
 async def login_via_google(
     request: GoogleLoginRequest, 
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_session)
 ):
     async with httpx.AsyncClient() as client:
         token_url = "https://oauth2.googleapis.com/token"
@@ -93,22 +115,24 @@ async def login_via_google(
          raise HTTPException(status_code=400, detail="Google account has no email")
 
     # 3. DB Logic
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        user = models.User(email=email)
-        db.add(user)
-    
-    user.google_access_token = google_access_token
-    if google_refresh_token:
-        user.google_refresh_token = google_refresh_token
-    
-    db.commit()
+    expiry = expiry_from_seconds(tokens.get("expires_in"))
+    if isinstance(db, AsyncSession):
+        user = await crud_async.get_user_by_email(db, email)
+        if not user:
+            user = models.User(email=email)
+            db.add(user)
+        _apply_google_tokens(user, google_access_token, google_refresh_token, expiry)
+        await db.commit()
+    else:
+        user = await run_in_threadpool(
+            _store_google_tokens, db, email, google_access_token, google_refresh_token, expiry
+        )
 
     # 4. CREATE THE REAL JWT
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     access_token = create_access_token(
-        data={"sub": user.email}, 
+        data={"sub": email}, 
         expires_delta=access_token_expires
     )
 
@@ -162,6 +186,27 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
     return user
 
+def is_admin(user: models.User) -> bool:
+    return bool(user.email) and user.email.lower() in config.ADMIN_EMAILS
+
+def require_admin(current_user: models.User = Depends(get_current_user)):
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+@router.patch("/me", response_model=schemas.UserRead)
+def update_me(
+    data: schemas.UserUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Sets the host's time zone, used by event types that don't have their own.
+    """
+    if data.timezone is not None and not is_valid_timezone(data.timezone):
+        raise HTTPException(status_code=422, detail=f"Unknown time zone {data.timezone!r}")
+    return crud.set_user_timezone(db, current_user, data.timezone)
+
 @router.get("/google/callback")
 async def auth_google_callback(request: Request, db: Session = Depends(get_db)):
     token = await oauth.google.authorize_access_token(request)
@@ -175,9 +220,13 @@ async def auth_google_callback(request: Request, db: Session = Depends(get_db)):
         db.add(user)
     
     user.google_access_token = token.get('access_token')
+    if token.get('expires_at'):
+        user.google_token_expiry = datetime.utcfromtimestamp(token['expires_at'])
     
     if token.get('refresh_token'):
         user.google_refresh_token = token.get('refresh_token')
+    user.google_refresh_failures = 0
+    user.google_refresh_retry_at = None
         
     db.commit()
     
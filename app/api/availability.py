@@ -16,7 +16,10 @@ def set_availability(
     et = crud.get_event_type(db, event_type_id)
     if not et:
         raise HTTPException(status_code=404, detail="Event type not found")
-    new_rules = crud.set_availability_rules(db, et, rules)
+    try:
+        new_rules = crud.set_availability_rules(db, et, rules)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     return new_rules
 
 @router.patch("/{event_type_id}/availability", response_model=List[schemas.AvailabilityRuleRead])
@@ -28,5 +31,8 @@ def update_availability(
     et = crud.get_event_type(db, event_type_id)
     if not et:
         raise HTTPException(status_code=404, detail="Event type not found")
-    updated_rules = crud.update_availability_rules(db, et, rules)
+    try:
+        updated_rules = crud.update_availability_rules(db, et, rules)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     return updated_rules
\ No newline at end of file
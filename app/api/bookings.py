@@ -0,0 +1,231 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.api.auth import get_current_user
+
+from ..db import SessionLocal, get_db
+from .. import config, crud, models, schemas
+from ..services.calendar_worker import calendar_worker
+from ..services.slot_store import slot_materializer
+from ..services.timezones import event_type_timezone, to_wall_clock
+
+router = APIRouter(prefix="/event-types", tags=["bookings"])
+
+EXPORT_COLUMNS = [
+    "id", "start_datetime", "end_datetime", "invitee_name", "invitee_email",
+    "invitee_note", "status", "gcal_event_id",
+]
+
+
+def _owned_event_type(
+    event_type_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+) -> models.EventType:
+    et = crud.get_event_type(db, event_type_id, options=())
+    if not et or et.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Event type not found")
+    return et
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    """
+    Yields the request body line by line as it arrives.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    """
+    Parses CSV with a header line into dicts. Quoted fields may span lines.
+    """
+    header = None
+    record = None
+    number = 0
+    async for line in lines:
+        record = line if record is None else record + "\n" + line
+        if record.count('"') % 2:
+            continue  # inside a quoted field
+        text, record = record, None
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        number += 1
+        yield number, {k: (v if v != "" else None) for k, v in zip(header, values)}
+    if record is not None:
+        yield number + 1, None
+
+
+async def _ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _validate(row: Optional[dict], timezone: str) -> dict:
+    """
+    Turns one raw row into BookingCreate values or raises ValueError.
+    Offset datetimes are stored as wall-clock time in `timezone`.
+    """
+    if row is None:
+        raise ValueError("malformed row")
+    try:
+        data = schemas.BookingCreate(**row)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+        ))
+    if (data.start_datetime.tzinfo is None) != (data.end_datetime.tzinfo is None):
+        raise ValueError("start_datetime and end_datetime must both have an offset or neither")
+    data.start_datetime = to_wall_clock(data.start_datetime, timezone)
+    data.end_datetime = to_wall_clock(data.end_datetime, timezone)
+    if data.end_datetime <= data.start_datetime:
+        raise ValueError("end_datetime must be after start_datetime")
+    if data.end_datetime - data.start_datetime > crud.MAX_BOOKING_DURATION:
+        raise ValueError("booking is too long")
+    return data.dict()
+
+
+def _write_batch(
+    event_type_id: int, batch: List[Tuple[int, dict]], sync_calendar: bool
+) -> Tuple[int, List[dict]]:
+    """
+    Writes one batch in a single transaction. If the database rejects it
+    (e.g. the Postgres no-overlap constraint), falls back to row by row
+    so only the offending rows are reported.
+    """
+    db = SessionLocal()
+    try:
+        try:
+            return crud.bulk_insert_bookings(db, event_type_id, [v for _, v in batch], sync_calendar), []
+        except IntegrityError:
+            db.rollback()
+
+        imported, errors = 0, []
+        for number, values in batch:
+            try:
+                imported += crud.bulk_insert_bookings(db, event_type_id, [values], sync_calendar)
+            except IntegrityError as e:
+                db.rollback()
+                errors.append({"row": number, "error": str(e.orig)})
+        return imported, errors
+    finally:
+        db.close()
+
+
+@router.post("/{event_type_id}/bookings/import")
+async def import_bookings(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults from Content-Type"),
+    sync_calendar: bool = Query(False, description="Queue a Google Calendar event per booking"),
+    et: models.EventType = Depends(_owned_event_type),
+):
+    """
+    Bulk-loads bookings from a streamed CSV (with header) or NDJSON body.
+    Rows are validated as BookingCreate and written in batches of
+    BOOKING_IMPORT_BATCH_SIZE, one transaction per batch. Invalid rows are
+    skipped and reported.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    rows = _csv_rows(_lines(request)) if format == "csv" else _ndjson_rows(_lines(request))
+    timezone = event_type_timezone(et)
+
+    imported, failed, errors = 0, 0, []
+    batch: List[Tuple[int, dict]] = []
+
+    def report(new_errors):
+        nonlocal failed
+        failed += len(new_errors)
+        errors.extend(new_errors[: max(0, config.BOOKING_IMPORT_MAX_ERRORS - len(errors))])
+
+    async def flush():
+        nonlocal imported
+        written, batch_errors = await run_in_threadpool(_write_batch, et.id, batch, sync_calendar)
+        imported += written
+        report(batch_errors)
+        batch.clear()
+
+    async for number, row in rows:
+        try:
+            batch.append((number, _validate(row, timezone)))
+        except ValueError as e:
+            report([{"row": number, "error": str(e)}])
+            continue
+        if len(batch) >= config.BOOKING_IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    if sync_calendar and imported:
+        calendar_worker.notify()
+    if imported:
+        slot_materializer.notify()
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+@router.get("/{event_type_id}/bookings/export")
+def export_bookings(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    et: models.EventType = Depends(_owned_event_type),
+):
+    """
+    Streams the event type's bookings as NDJSON or CSV, reading rows in chunks.
+    """
+    event_type_id = et.id
+
+    def rows():
+        # The request's session is closed before streaming starts, so use our own
+        db = SessionLocal()
+        try:
+            if format == "csv":
+                out = io.StringIO()
+                writer = csv.writer(out)
+                writer.writerow(EXPORT_COLUMNS)
+                for booking in crud.iter_bookings(db, event_type_id, chunk_size=config.EXPORT_CHUNK_SIZE):
+                    writer.writerow([
+                        v.isoformat() if hasattr(v, "isoformat") else v
+                        for v in (getattr(booking, c) for c in EXPORT_COLUMNS)
+                    ])
+                    if out.tell() > 64 * 1024:
+                        yield out.getvalue()
+                        out.seek(0)
+                        out.truncate()
+                yield out.getvalue()
+            else:
+                for booking in crud.iter_bookings(db, event_type_id, chunk_size=config.EXPORT_CHUNK_SIZE):
+                    yield schemas.BookingRead.model_validate(booking, from_attributes=True).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type)
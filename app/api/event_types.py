@@ -1,27 +1,74 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, is_admin
 
-from ..db import get_db
-from .. import schemas, crud, models
+from ..db import SessionLocal, get_db
+from .. import config, schemas, crud, models
+from ..services.timezones import event_type_timezone, is_valid_timezone
 
 
 router = APIRouter(prefix="/event-types", tags=["event-types"])
 
 
+def _check_timezone(value: Optional[str]):
+    if value is not None and not is_valid_timezone(value):
+        raise HTTPException(status_code=422, detail=f"Unknown time zone {value!r}")
+
+
 @router.post("/", response_model=schemas.EventTypeRead)
 def create_event_type(
     event: schemas.EventTypeCreate, db: Session = Depends(get_db),current_user: models.User = Depends(get_current_user)
 ):
+    _check_timezone(event.timezone)
     return crud.create_event_type(db, event, user_id=current_user.id)
 
 
 @router.get("/", response_model=List[schemas.EventTypeRead])
-def list_event_types(db: Session = Depends(get_db)):
-    return crud.get_event_types(db)
+def list_event_types(
+    response: Response,
+    limit: int = Query(config.EVENT_TYPES_PAGE_SIZE, ge=1, le=config.EVENT_TYPES_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Lists the current user's event types, one keyset page at a time.
+    When more rows exist, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    page = crud.get_event_types(db, current_user.id, after_id=cursor, limit=limit + 1)
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = str(page[-1].id)
+    return page
+
+
+@router.get("/export")
+def export_event_types(
+    all_users: bool = Query(False, alias="all"),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Streams event types as NDJSON, one object per line, reading rows in chunks.
+    all=true exports every tenant and is limited to admins.
+    """
+    if all_users and not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    user_id = None if all_users else current_user.id
+
+    def rows():
+        # The request's session is closed before streaming starts, so use our own
+        db = SessionLocal()
+        try:
+            for et in crud.iter_event_types(db, user_id, chunk_size=config.EXPORT_CHUNK_SIZE):
+                yield schemas.EventTypeRead.model_validate(et, from_attributes=True).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
 
 
 @router.get("/{event_type_id}", response_model=schemas.EventTypeRead)
@@ -38,6 +85,7 @@ def update_event_type(
     data: schemas.EventTypeUpdate,
     db: Session = Depends(get_db),
 ):
+    _check_timezone(data.timezone)
     et = crud.get_event_type(db, event_type_id)
     if not et:
         raise HTTPException(status_code=404, detail="Event type not found")
@@ -49,14 +97,18 @@ def patch_event_type(
     data: dict, # Using dict to accept partial updates dynamically
     db: Session = Depends(get_db),
 ):
+    _check_timezone(data.get("timezone"))
     et = crud.get_event_type(db, event_type_id)
     if not et:
         raise HTTPException(status_code=404, detail="Event type not found")
     
     # Update only the fields provided in the request body
+    old_timezone = event_type_timezone(et)
     for key, value in data.items():
         if hasattr(et, key):
             setattr(et, key, value)
+    crud.rezone_bookings(db, [et.id], old_timezone, event_type_timezone(et))
+    crud.bump_event_type_version(et)
             
     db.commit()
     db.refresh(et)
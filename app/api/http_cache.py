@@ -0,0 +1,57 @@
+"""
+Conditional GET helpers for the public endpoints.
+
+ETags are derived from version-like values (event type version, booking
+counts/timestamps, busy-mirror changes), so a matching If-None-Match can
+be answered with 304 before anything expensive is computed.
+"""
+import hashlib
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+
+from .. import config
+
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest()[:24] + '"'
+
+
+def busy_epoch(busy_changed_at) -> object:
+    """
+    The Google part of a slots validator. The busy mirror records when it
+    last changed; live freebusy results may change at any time, so they are
+    only trusted for one busy-cache TTL (or one max-age without a cache).
+    """
+    if config.BUSY_SOURCE == "mirror" and busy_changed_at is not None:
+        return busy_changed_at
+    ttl = config.BUSY_CACHE_TTL_SECONDS if config.BUSY_CACHE_ENABLED else config.PUBLIC_SLOTS_MAX_AGE_SECONDS
+    return int(time.time() // max(1, ttl))
+
+
+def cache_control(max_age: int) -> str:
+    if max_age <= 0:
+        return "no-cache"
+    return f"public, max-age={max_age}, stale-while-revalidate={config.PUBLIC_STALE_WHILE_REVALIDATE_SECONDS}"
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    # If-None-Match uses weak comparison
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def set_cache_headers(response: Response, etag: Optional[str], max_age: int):
+    if etag is not None:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control(max_age)
+
+
+def not_modified(etag: str, max_age: int) -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, max_age)
+    return response
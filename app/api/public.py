@@ -1,143 +1,348 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-import pytz
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, time, timedelta, date
-from typing import List
-from ..db import get_db
-from .. import schemas, crud, models
-from ..services.google_calendar import create_event_for_booking,get_busy_intervals, is_overlapping, DEFAULT_TIMEZONE
+from typing import Dict, List, Optional, Tuple
+from ..db import AnySession, get_read_db, get_read_session, get_session
+from .. import config, schemas, crud, crud_async, models
+from .http_cache import busy_epoch, is_not_modified, make_etag, not_modified, set_cache_headers
+from ..services.google_calendar_async import get_busy_intervals
+from ..services.calendar_worker import calendar_worker
+from ..services.intervals import Interval, normalize_busy
+from ..services.schedule import CompiledSchedule, get_schedule
+from ..services.metrics import stage
+from ..services.singleflight import AsyncSingleFlight
+from ..services.slot_engine import (
+    candidate_starts, days_json, drop_repeated_times, free_starts, render_day, split_days,
+)
+from ..services.slot_store import servable_days, slot_materializer
+from ..services.timezones import (
+    event_type_timezone, is_valid_timezone, local_days, midnight_epoch, to_utc, to_wall_clock, utc_datetime,
+)
 
 router = APIRouter(prefix="/public", tags=["public"])
 
+MAX_RANGE_DAYS = 62
+# An invitee's day can be up to 26 hours away from the host's (UTC-12 vs UTC+14)
+MAX_ZONE_SKEW_DAYS = 2
 
-def _parse_time_str(s: str) -> time:
-    h, m = map(int, s.split(":"))
-    return time(hour=h, minute=m)
-
-
-def _generate_slots_for_date(
-    event_type: models.EventType, rules: List[models.AvailabilityRule], day: date
-) -> List[schemas.TimeSlot]:
-    slots: List[schemas.TimeSlot] = []
-    duration = timedelta(minutes=event_type.duration_minutes)
-    buffer = timedelta(minutes=event_type.buffer_minutes)
-
-    for rule in rules:
-        start_t = _parse_time_str(rule.start_time)
-        end_t = _parse_time_str(rule.end_time)
-
-        current = datetime.combine(day, start_t)
-        end_dt = datetime.combine(day, end_t)
-
-        while current + duration <= end_dt:
-            slot_start = current
-            slot_end = current + duration
-            slots.append(
-                schemas.TimeSlot(start=slot_start, end=slot_end)
-            )
-            current = slot_end + buffer
-
-    return slots
+slot_flights = AsyncSingleFlight("slots")
+# Shared computations outlive the request that started them, so they use their own session
+_own_read_session = asynccontextmanager(get_read_session)
 
 
 @router.get("/{slug}/details", response_model=schemas.PublicEventTypeRead)
-def get_public_event_type(slug: str, db: Session = Depends(get_db)):
-    et = crud.get_event_type_by_slug(db, slug)
+def get_public_event_type(
+    slug: str, request: Request, response: Response, db: Session = Depends(get_read_db)
+):
+    et = crud.get_event_type_by_slug(db, slug, options=crud.WITH_OWNER)
     if not et or not et.is_active:
         raise HTTPException(status_code=404, detail="Event type not found")
-    
+
+    timezone = event_type_timezone(et)
+    etag = make_etag("details", et.id, et.version, et.owner.email, timezone)
+    if is_not_modified(request, etag):
+        return not_modified(etag, config.PUBLIC_DETAILS_MAX_AGE_SECONDS)
+    set_cache_headers(response, etag, config.PUBLIC_DETAILS_MAX_AGE_SECONDS)
     return schemas.PublicEventTypeRead(
         name=et.name,
         slug=et.slug,
         duration_minutes=et.duration_minutes,
         location_type=et.location_type,
-        host_name=et.owner.email
+        host_name=et.owner.email,
+        timezone=timezone,
+    )
+
+
+def _parse_timezone(value: Optional[str]) -> Optional[str]:
+    if value is not None and not is_valid_timezone(value):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone {value!r}")
+    return value
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
+
+
+def _check_active(et: models.EventType) -> models.EventType:
+    if not et or not et.is_active:
+        raise HTTPException(status_code=404, detail="Event type not found")
+    return et
+
+
+def _load_active_event_type_sync(db: Session, slug: str) -> models.EventType:
+    # The owner is joined in; rules are only loaded on a compiled-schedule miss.
+    return _check_active(crud.get_event_type_by_slug(db, slug, options=crud.WITH_OWNER))
+
+
+def _load_schedule_context_sync(db: Session, slug: str) -> Tuple[models.EventType, CompiledSchedule]:
+    et = _load_active_event_type_sync(db, slug)
+    return et, get_schedule(et)
+
+
+async def _load_active_event_type(db: AnySession, slug: str) -> models.EventType:
+    if isinstance(db, AsyncSession):
+        return _check_active(await crud_async.get_event_type_by_slug(db, slug))
+    return await run_in_threadpool(_load_active_event_type_sync, db, slug)
+
+
+async def _load_schedule_context(db: AnySession, slug: str) -> Tuple[models.EventType, CompiledSchedule]:
+    if isinstance(db, AsyncSession):
+        et = await _load_active_event_type(db, slug)
+        return et, get_schedule(et)  # rules were eager-loaded
+    return await run_in_threadpool(_load_schedule_context_sync, db, slug)
+
+
+async def _load_local_busy(db: AnySession, event_type_id: int, window_start: datetime, window_end: datetime) -> list:
+    if isinstance(db, AsyncSession):
+        intervals = await crud_async.get_active_booking_intervals(db, event_type_id, window_start, window_end)
+    else:
+        intervals = await run_in_threadpool(
+            crud.get_active_booking_intervals, db, event_type_id, window_start, window_end
+        )
+    return [{'start': start, 'end': end} for start, end in intervals]
+
+
+async def _load_google_busy(db: AnySession, owner: models.User, start: int, end: int) -> list:
+    """
+    Host's Google busy periods for [start, end) (epoch seconds): from the
+    synced mirror when BUSY_SOURCE=mirror and the host has been synced,
+    otherwise from a live (cached) freebusy query.
+    """
+    if config.BUSY_SOURCE == "mirror":
+        start_utc = utc_datetime(start).replace(tzinfo=None)
+        end_utc = utc_datetime(end).replace(tzinfo=None)
+        if isinstance(db, AsyncSession):
+            blocks = await crud_async.get_busy_blocks(db, owner.id, start_utc, end_utc)
+        else:
+            blocks = await run_in_threadpool(crud.get_busy_blocks, db, owner.id, start_utc, end_utc)
+        if blocks is not None:
+            return [{'start': to_utc(s), 'end': to_utc(e)} for s, e in blocks]
+    return await get_busy_intervals(owner, utc_datetime(start), utc_datetime(end))
+
+
+async def _load_busy_times(
+    db: AnySession, et: models.EventType, timezone: str, first_day: date, last_day: date
+) -> List[Interval]:
+    """
+    Collects Google busy periods and local bookings for the host days
+    [first_day, last_day] with one freebusy call (or mirror query) and one
+    bookings query. Returns them as merged epoch intervals.
+    """
+    window_start = midnight_epoch(first_day, timezone)
+    window_end = midnight_epoch(last_day + timedelta(days=1), timezone)
+
+    google = _load_google_busy(db, et.owner, window_start, window_end)
+    # Bookings are stored as wall-clock time in the event type's zone
+    local = _load_local_busy(
+        db, et.id, datetime.combine(first_day, time.min), datetime.combine(last_day + timedelta(days=1), time.min)
+    )
+    if config.BUSY_SOURCE == "mirror":
+        # Both read through `db`, which can't run two queries at once.
+        google_busy = await google
+        local_busy = await local
+    else:
+        # Overlap the Google round-trip with the bookings query.
+        google_busy, local_busy = await asyncio.gather(google, local)
+    return normalize_busy(google_busy + local_busy, timezone)
+
+
+async def _load_materialized(db: AnySession, slug: str, first_day: date, last_day: date):
+    """
+    Stored slots per day when every day in the range can be served from
+    slot_days; None means compute live.
+    """
+    if isinstance(db, AsyncSession):
+        rows = await crud_async.get_slot_days(db, slug, first_day, last_day)
+    else:
+        rows = await run_in_threadpool(crud.get_slot_days, db, slug, first_day, last_day)
+    return servable_days(rows, first_day, last_day)
+
+
+async def _slots_etag(
+    db: AnySession, slug: str, first_day: date, last_day: date, tz: Optional[str]
+) -> Optional[str]:
+    """
+    Strong ETag for the slots of [first_day, last_day] from one validator
+    query; None for an unknown or inactive slug.
+    """
+    # Days in an invitee zone cover neighbouring host days too
+    pad = timedelta(days=MAX_ZONE_SKEW_DAYS if tz else 0)
+    start = datetime.combine(first_day - pad, time.min)
+    end = datetime.combine(last_day + timedelta(days=1) + pad, time.min)
+    if isinstance(db, AsyncSession):
+        row = await crud_async.get_slots_validator(db, slug, start, end)
+    else:
+        row = await run_in_threadpool(crud.get_slots_validator, db, slug, start, end)
+    if row is None:
+        return None
+    et_id, version, booking_count, booking_changed, busy_changed = row
+    return make_etag(
+        "slots", et_id, version, first_day, last_day, tz,
+        booking_count, booking_changed, busy_epoch(busy_changed),
     )
 
 
+async def _compute_slots(slug: str, first_day: date, last_day: date, tz: Optional[str]) -> Dict[date, str]:
+    """
+    Free slots for each day of [first_day, last_day] in the invitee zone `tz`
+    (the event type's zone if None), rendered as JSON arrays. Everything in
+    between is epoch seconds.
+    """
+    async with _own_read_session() as db:
+        et, schedule = await _load_schedule_context(db, slug)
+        host_tz = event_type_timezone(et)
+        out_tz = tz or host_tz
+
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        bounds = [midnight_epoch(d, out_tz) for d in days]
+        bounds.append(midnight_epoch(last_day + timedelta(days=1), out_tz))
+        host_first, host_last = local_days(bounds[0], bounds[-1], host_tz)
+        host_days = [host_first + timedelta(days=i) for i in range((host_last - host_first).days + 1)]
+        if not any(schedule.has_slots_on(d) for d in host_days):
+            return {d: "[]" for d in days}
+
+        busy = await _load_busy_times(db, et, host_tz, host_first, host_last)
+
+    with stage("slots"):
+        starts = candidate_starts(schedule, host_days, host_tz)
+    with stage("filter"):
+        free = free_starts(starts, schedule.duration_seconds, busy)
+        if tz is None:
+            # Naive times in the host zone can't tell the repeated DST hour apart
+            free = drop_repeated_times(free, schedule.duration_seconds, host_days, host_tz)
+    with stage("render"):
+        return {
+            d: render_day(d, day_free, schedule.duration_seconds, out_tz, aware=tz is not None)
+            for d, day_free in zip(days, split_days(free, bounds))
+        }
+
+
+async def _live_slots(
+    db: AnySession, slug: str, etag: Optional[str], first_day: date, last_day: date, tz: Optional[str]
+) -> Dict[date, str]:
+    """
+    Computes free slots per day, sharing the work between concurrent
+    identical requests. The ETag covers everything the result depends on,
+    so requests only coalesce when they would get the same answer.
+    """
+    # Give the request's connection back first: waiters holding theirs
+    # could otherwise starve the shared computation of one.
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+    key = etag or (slug, first_day, last_day, tz)
+    return await slot_flights.do(key, _compute_slots, slug, first_day, last_day, tz)
+
+
+def _slots_response(body: str, etag: Optional[str]) -> Response:
+    # Slots are already JSON text; skip response_model validation and re-serialization
+    response = Response(content=body, media_type="application/json")
+    set_cache_headers(response, etag, config.PUBLIC_SLOTS_MAX_AGE_SECONDS)
+    return response
+
+
 @router.get("/{slug}/slots", response_model=List[schemas.TimeSlot])
-def get_slots_for_date(
+async def get_slots_for_date(
     slug: str,
+    request: Request,
     date_str: str = Query(..., alias="date"),
-    db: Session = Depends(get_db),
+    tz: Optional[str] = Query(None, description="Invitee's IANA time zone; slots are then returned as offset datetimes in it"),
+    db: AnySession = Depends(get_read_session),
 ):
-    et = crud.get_event_type_by_slug(db, slug)
-    if not et or not et.is_active:
-        raise HTTPException(status_code=404, detail="Event type not found")
+    """
+    Free slots of one day. Without `tz` the day and the returned naive times
+    are in the event type's zone; with `tz` they are in the invitee's.
+    """
+    day = _parse_day(date_str)
+    tz = _parse_timezone(tz)
+    etag = await _slots_etag(db, slug, day, day, tz)
+    if is_not_modified(request, etag):
+        return not_modified(etag, config.PUBLIC_SLOTS_MAX_AGE_SECONDS)
+
+    # Stored days are the host's days, so only requests in the host's zone can use them
+    if config.SLOT_MATERIALIZATION_ENABLED and tz is None:
+        stored = await _load_materialized(db, slug, day, day)
+        if stored is not None:
+            return _slots_response(stored[day], etag)
+
+    live = await _live_slots(db, slug, etag, day, day, tz)
+    return _slots_response(live[day], etag)
 
-    try:
-        day = datetime.fromisoformat(date_str).date()
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
 
-    weekday = day.weekday()
-    rules = [r for r in et.availability_rules if r.weekday == weekday]
-    possible_slots = _generate_slots_for_date(et, rules, day)
+@router.get("/{slug}/slots/range", response_model=List[schemas.DaySlots])
+async def get_slots_for_range(
+    slug: str,
+    request: Request,
+    from_str: str = Query(..., alias="from"),
+    to_str: str = Query(..., alias="to"),
+    tz: Optional[str] = Query(None, description="Invitee's IANA time zone; slots are then returned as offset datetimes in it"),
+    db: AnySession = Depends(get_read_session),
+):
+    """
+    Returns free slots for every day in [from, to] (inclusive), grouped by day
+    (in the invitee's zone `tz` when given).
+    Busy times are fetched once for the whole window instead of once per day.
+    """
+    first_day = _parse_day(from_str)
+    last_day = _parse_day(to_str)
+    tz = _parse_timezone(tz)
+    if last_day < first_day:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    num_days = (last_day - first_day).days + 1
+    if num_days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
 
-    if not possible_slots:
-        return []
+    etag = await _slots_etag(db, slug, first_day, last_day, tz)
+    if is_not_modified(request, etag):
+        return not_modified(etag, config.PUBLIC_SLOTS_MAX_AGE_SECONDS)
 
-    tz = pytz.timezone(DEFAULT_TIMEZONE)
-    start_of_day = tz.localize(datetime.combine(day, time.min))
-    end_of_day = tz.localize(datetime.combine(day, time.max))
+    days = [first_day + timedelta(days=i) for i in range(num_days)]
+    if config.SLOT_MATERIALIZATION_ENABLED and tz is None:
+        stored = await _load_materialized(db, slug, first_day, last_day)
+        if stored is not None:
+            return _slots_response(days_json(days, [stored[d] for d in days]), etag)
 
-    google_busy = []
-    try:
-        google_busy = get_busy_intervals(et.owner, start_of_day, end_of_day)
-    except Exception as e:
-        print(f"Google Calendar Error: {e}") 
-       
-    local_bookings = db.query(models.Booking).filter(
-        models.Booking.event_type_id == et.id,
-        models.Booking.start_datetime >= day, # Simplified check
-        models.Booking.end_datetime <= datetime.combine(day, time.max),
-        models.Booking.status != "cancelled"  # Ignore cancelled bookings
-    ).all()
-
-    local_busy = []
-    for b in local_bookings:
-        local_busy.append({
-            'start': b.start_datetime,
-            'end': b.end_datetime
-        })
-
-    all_busy_times = google_busy + local_busy
-
-    final_slots = []
-    for slot in possible_slots:
-        if not is_overlapping(slot.start, slot.end, all_busy_times):
-            final_slots.append(slot)
-
-    return final_slots
+    live = await _live_slots(db, slug, etag, first_day, last_day, tz)
+    return _slots_response(days_json(days, [live[d] for d in days]), etag)
 
 @router.post("/{slug}/book", response_model=schemas.BookingRead)
-def book_slot(
+async def book_slot(
     slug: str,
     data: schemas.BookingCreate,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_session),
 ):
-    et = crud.get_event_type_by_slug(db, slug)
-    if not et or not et.is_active:
-        raise HTTPException(status_code=404, detail="Event type not found")
+    if (data.start_datetime.tzinfo is None) != (data.end_datetime.tzinfo is None):
+        raise HTTPException(status_code=400, detail="start_datetime and end_datetime must both have an offset or neither")
+    if data.end_datetime <= data.start_datetime:
+        raise HTTPException(status_code=400, detail="end_datetime must be after start_datetime")
+    if data.end_datetime - data.start_datetime > crud.MAX_BOOKING_DURATION:
+        raise HTTPException(status_code=400, detail="Booking is too long")
+
+    et = await _load_active_event_type(db, slug)
+    # Offset datetimes (e.g. slots fetched with ?tz=) are stored as the event type's wall-clock time
+    timezone = event_type_timezone(et)
+    data = data.copy(update={
+        "start_datetime": to_wall_clock(data.start_datetime, timezone),
+        "end_datetime": to_wall_clock(data.end_datetime, timezone),
+    })
 
-    booking = crud.create_booking(db, et, data)
+    # The Google event is created by the calendar worker once the row is committed.
+    if isinstance(db, AsyncSession):
+        booking = await crud_async.create_booking_with_calendar_job(db, et, data)
+    else:
+        booking = await run_in_threadpool(crud.create_booking_with_calendar_job, db, et, data)
     if not booking:
-        raise HTTPException(status_code=500, detail="Internal Server Error: Booking creation failed")
+        raise HTTPException(status_code=409, detail="This time slot is no longer available")
 
-    booking.status = "pending"
-    db.commit()      # Save pending state
-    db.refresh(booking)
-    try:
-        event_id = create_event_for_booking(booking, et)
-        booking.gcal_event_id = event_id
-        db.add(booking)
-        db.commit()  # Update with GCal ID
-        db.refresh(booking)
-    except Exception as e:
-        # If Google fails, we log it, but the USER still gets their booking confirmation
-        print(f"WARNING: Failed to create Google Calendar event: {e}")
-        # Optional: You could append a warning note to the response if your schema allows it
-   
+    calendar_worker.notify()
+    slot_materializer.notify()
     return booking
-
@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+
+from ..db import get_db
+from ..services.calendar_sync import calendar_syncer, sync_user, user_for_channel
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+@router.post("/google/calendar")
+def google_calendar_notification(
+    background_tasks: BackgroundTasks,
+    channel_id: str = Header(..., alias="X-Goog-Channel-ID"),
+    channel_token: Optional[str] = Header(None, alias="X-Goog-Channel-Token"),
+    resource_state: Optional[str] = Header(None, alias="X-Goog-Resource-State"),
+    db: Session = Depends(get_db),
+):
+    """
+    Receives Google watch-channel pushes. The body is empty; the headers
+    say which channel changed, and the changes are pulled with the sync token.
+    """
+    user_id = user_for_channel(db, channel_id, channel_token)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="Unknown channel")
+    if resource_state == "sync":
+        return {"ok": True}  # handshake sent when the channel is opened
+
+    if calendar_syncer.running:
+        calendar_syncer.mark_dirty(user_id)
+    else:
+        background_tasks.add_task(sync_user, user_id)
+    return {"ok": True}
@@ -0,0 +1,52 @@
+"""
+Maintenance commands.
+
+    python -m app.cli resync --email host@example.com [--since 2024-01-01] [--no-update]
+"""
+import argparse
+import json
+from datetime import datetime
+
+from . import models
+from .db import Base, SessionLocal, engine
+from .migrations import run_migrations
+from .services.calendar_batch import resync_user
+
+
+def _resync(args):
+    user_id = args.user_id
+    if user_id is None:
+        db = SessionLocal()
+        try:
+            user = db.query(models.User).filter(models.User.email == args.email).first()
+        finally:
+            db.close()
+        if user is None:
+            raise SystemExit(f"No user with email {args.email}")
+        user_id = user.id
+
+    since = datetime.fromisoformat(args.since) if args.since else None
+    summary = resync_user(user_id, since=since, update_existing=not args.no_update)
+    print(json.dumps(summary, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    resync = commands.add_parser("resync", help="Batch-sync a host's bookings to Google Calendar")
+    who = resync.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user-id", type=int)
+    who.add_argument("--email")
+    resync.add_argument("--since", help="Only bookings starting at or after this ISO date/time")
+    resync.add_argument("--no-update", action="store_true", help="Don't patch events that already exist")
+    resync.set_defaults(func=_resync)
+
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---------- Time zones ----------
+# Zone for event types whose host hasn't set one (IANA name)
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Almaty")
+
+# ---------- Google free/busy cache ----------
+BUSY_CACHE_ENABLED = _bool("BUSY_CACHE_ENABLED", True)
+BUSY_CACHE_TTL_SECONDS = int(os.getenv("BUSY_CACHE_TTL_SECONDS", "120"))
+BUSY_CACHE_MAX_ENTRIES = int(os.getenv("BUSY_CACHE_MAX_ENTRIES", "5000"))
+# "memory" (per process) or "redis" (shared between workers, needs REDIS_URL)
+BUSY_CACHE_BACKEND = os.getenv("BUSY_CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL")
+# Concurrent identical freebusy lookups and slot computations share one in-flight call
+SINGLEFLIGHT_ENABLED = _bool("SINGLEFLIGHT_ENABLED", True)
+
+# ---------- Google busy mirror ----------
+# "live": freebusy query per slot request; "mirror": read the locally synced busy_blocks table
+BUSY_SOURCE = os.getenv("BUSY_SOURCE", "live")
+CALENDAR_SYNC_ENABLED = _bool("CALENDAR_SYNC_ENABLED", BUSY_SOURCE == "mirror")
+# Fallback poll for hosts without a push channel (or when pushes are lost)
+CALENDAR_SYNC_INTERVAL_SECONDS = int(os.getenv("CALENDAR_SYNC_INTERVAL_SECONDS", "300"))
+# Public HTTPS URL of POST /webhooks/google/calendar; watch channels are only created when set
+GOOGLE_WEBHOOK_URL = os.getenv("GOOGLE_WEBHOOK_URL")
+CALENDAR_WATCH_RENEW_MARGIN_SECONDS = int(os.getenv("CALENDAR_WATCH_RENEW_MARGIN_SECONDS", "86400"))
+
+# ---------- Public HTTP caching ----------
+PUBLIC_DETAILS_MAX_AGE_SECONDS = int(os.getenv("PUBLIC_DETAILS_MAX_AGE_SECONDS", "300"))
+PUBLIC_SLOTS_MAX_AGE_SECONDS = int(os.getenv("PUBLIC_SLOTS_MAX_AGE_SECONDS", "15"))
+# Lets a CDN keep serving the old response while it revalidates in the background
+PUBLIC_STALE_WHILE_REVALIDATE_SECONDS = int(os.getenv("PUBLIC_STALE_WHILE_REVALIDATE_SECONDS", "60"))
+
+# ---------- Materialized slots ----------
+SLOT_MATERIALIZATION_ENABLED = _bool("SLOT_MATERIALIZATION_ENABLED", False)
+# Run the refresher inside the API process; disable when `python -m app.worker` runs it
+SLOT_MATERIALIZER_INPROCESS = _bool("SLOT_MATERIALIZER_INPROCESS", True)
+SLOT_HORIZON_DAYS = int(os.getenv("SLOT_HORIZON_DAYS", "60"))
+SLOT_REFRESH_INTERVAL_SECONDS = float(os.getenv("SLOT_REFRESH_INTERVAL_SECONDS", "30"))
+# Materialized days older than this are recomputed. Google changes are only
+# pushed with BUSY_SOURCE=mirror, so keep this short with BUSY_SOURCE=live.
+SLOT_MAX_AGE_SECONDS = int(os.getenv("SLOT_MAX_AGE_SECONDS", "3600" if BUSY_SOURCE == "mirror" else "120"))
+
+# ---------- Slot engine ----------
+# Generate and filter slots with NumPy when it is installed (the 'numpy' extra);
+# false forces the pure-Python path
+SLOT_ENGINE_NUMPY = _bool("SLOT_ENGINE_NUMPY", True)
+
+# ---------- Google API client pool ----------
+GOOGLE_CLIENT_POOL_SIZE = int(os.getenv("GOOGLE_CLIENT_POOL_SIZE", "256"))
+GOOGLE_CLIENT_IDLE_SECONDS = int(os.getenv("GOOGLE_CLIENT_IDLE_SECONDS", "900"))
+GOOGLE_HTTP_TIMEOUT_SECONDS = int(os.getenv("GOOGLE_HTTP_TIMEOUT_SECONDS", "20"))
+# Shared httpx pool used by the async client
+GOOGLE_HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_HTTP_MAX_CONNECTIONS", "100"))
+GOOGLE_HTTP_MAX_KEEPALIVE = int(os.getenv("GOOGLE_HTTP_MAX_KEEPALIVE", "20"))
+# Requests per Google batch HTTP call (Calendar recommends at most 50)
+GOOGLE_BATCH_SIZE = int(os.getenv("GOOGLE_BATCH_SIZE", "50"))
+# Bookings loaded per page during a calendar resync
+CALENDAR_RESYNC_PAGE_SIZE = int(os.getenv("CALENDAR_RESYNC_PAGE_SIZE", "500"))
+
+# ---------- Google token refresh ----------
+TOKEN_REFRESHER_ENABLED = _bool("TOKEN_REFRESHER_ENABLED", True)
+TOKEN_REFRESH_INTERVAL_SECONDS = int(os.getenv("TOKEN_REFRESH_INTERVAL_SECONDS", "60"))
+# Tokens expiring within this margin are renewed ahead of time
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "600"))
+# Only hosts whose Google access served a request this recently are refreshed
+# ahead; the rest refresh inline on their next call
+TOKEN_REFRESH_ACTIVE_SECONDS = int(os.getenv("TOKEN_REFRESH_ACTIVE_SECONDS", "86400"))
+# After a failed refresh the host is retried with exponential backoff
+TOKEN_REFRESH_BACKOFF_BASE_SECONDS = int(os.getenv("TOKEN_REFRESH_BACKOFF_BASE_SECONDS", "300"))
+TOKEN_REFRESH_BACKOFF_MAX_SECONDS = int(os.getenv("TOKEN_REFRESH_BACKOFF_MAX_SECONDS", "86400"))
+
+# ---------- Calendar outbox worker ----------
+# Run the worker inside the API process; disable when running `python -m app.worker` separately
+CALENDAR_WORKER_INPROCESS = _bool("CALENDAR_WORKER_INPROCESS", True)
+CALENDAR_WORKER_POLL_SECONDS = float(os.getenv("CALENDAR_WORKER_POLL_SECONDS", "5"))
+CALENDAR_WORKER_BATCH_SIZE = int(os.getenv("CALENDAR_WORKER_BATCH_SIZE", "20"))
+CALENDAR_JOB_MAX_ATTEMPTS = int(os.getenv("CALENDAR_JOB_MAX_ATTEMPTS", "8"))
+CALENDAR_JOB_BACKOFF_BASE_SECONDS = int(os.getenv("CALENDAR_JOB_BACKOFF_BASE_SECONDS", "30"))
+CALENDAR_JOB_BACKOFF_MAX_SECONDS = int(os.getenv("CALENDAR_JOB_BACKOFF_MAX_SECONDS", "3600"))
+# A 'running' job older than this is assumed to belong to a dead worker and is retried
+CALENDAR_JOB_LEASE_SECONDS = int(os.getenv("CALENDAR_JOB_LEASE_SECONDS", "300"))
+
+# ---------- Database ----------
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./kalendly.db")
+# Optional read replica for read-only public endpoints
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = _bool("DB_POOL_PRE_PING", True)
+SQLITE_WAL = _bool("SQLITE_WAL", True)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Serve the async routes through AsyncSession (asyncpg / aiosqlite) instead of
+# running the sync Session in the threadpool. Keep both available for benchmarking.
+DB_ASYNC = _bool("DB_ASYNC", False)
+# Adds an X-DB-Query-Count header to every response (handy for spotting N+1 queries)
+DB_QUERY_COUNT_HEADER = _bool("DB_QUERY_COUNT_HEADER", False)
+
+# ---------- Observability ----------
+# Prometheus metrics at /metrics (needs the 'metrics' extra)
+METRICS_ENABLED = _bool("METRICS_ENABLED", True)
+# OpenTelemetry spans around request stages (needs the 'tracing' extra; exporters are configured via OTEL_* env)
+TRACING_ENABLED = _bool("TRACING_ENABLED", False)
+# Per-stage timings (db, google, slots, ...) in a Server-Timing response header.
+# Off by default: it shows internals to every visitor and to shared caches.
+SERVER_TIMING_HEADER = _bool("SERVER_TIMING_HEADER", False)
+
+# ---------- Admin ----------
+# Comma-separated emails allowed to use cross-tenant admin endpoints
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# ---------- Listing ----------
+EVENT_TYPES_PAGE_SIZE = int(os.getenv("EVENT_TYPES_PAGE_SIZE", "50"))
+EVENT_TYPES_MAX_PAGE_SIZE = int(os.getenv("EVENT_TYPES_MAX_PAGE_SIZE", "200"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+
+# ---------- Booking import ----------
+BOOKING_IMPORT_BATCH_SIZE = int(os.getenv("BOOKING_IMPORT_BATCH_SIZE", "1000"))
+BOOKING_IMPORT_MAX_ERRORS = int(os.getenv("BOOKING_IMPORT_MAX_ERRORS", "100"))
@@ -1,10 +1,46 @@
 
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from . import models, schemas
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
+from . import config, models, schemas
+from .services.schedule import normalize_rules, schedule_cache
+from .services.timezones import DEFAULT_TIMEZONE, convert_wall_clock, event_type_timezone
+
+
+# ---------- User ----------
+def set_user_timezone(db: Session, user: models.User, timezone: Optional[str]) -> models.User:
+    """
+    Changes the host's default zone. Event types without a zone of their own
+    now read their rules and bookings in it, so their versions are bumped and
+    their bookings rewritten to keep the same instants.
+    """
+    inheriting = select(models.EventType.id).where(
+        models.EventType.user_id == user.id, models.EventType.timezone.is_(None)
+    )
+    rezone_bookings(db, inheriting, user.timezone or DEFAULT_TIMEZONE, timezone or DEFAULT_TIMEZONE)
+    user.timezone = timezone
+    db.execute(
+        update(models.EventType)
+        .where(models.EventType.user_id == user.id, models.EventType.timezone.is_(None))
+        .values(version=models.EventType.version + 1)
+    )
+    db.commit()
+    db.refresh(user)
+    return user
 
 
 # ---------- EventType ----------
+def bump_event_type_version(event_type: models.EventType):
+    """
+    Marks the event type's schedule as changed. Call before committing.
+    """
+    # Incremented in SQL, so concurrent edits each count
+    event_type.version = models.EventType.version + 1
+    schedule_cache.invalidate(event_type.id)
+
+
 def create_event_type(db: Session, data: schemas.EventTypeCreate, user_id: int) -> models.EventType:
     et = models.EventType(**data.dict(), user_id=user_id)
     db.add(et)
@@ -13,82 +49,204 @@ def create_event_type(db: Session, data: schemas.EventTypeCreate, user_id: int)
     return et
 
 
-def get_event_types(db: Session) -> List[models.EventType]:
-    return db.query(models.EventType).all()
+# Eager-loading options per use, so serializing an event type doesn't
+# lazy-load its relationships one row at a time.
+WITH_RULES = (selectinload(models.EventType.availability_rules),)
+WITH_OWNER = (joinedload(models.EventType.owner),)
+
+
+def get_event_types(
+    db: Session, user_id: int, after_id: Optional[int] = None, limit: int = 50
+) -> List[models.EventType]:
+    """
+    One keyset page of the user's event types, ordered by id.
+    """
+    query = db.query(models.EventType).options(*WITH_RULES).filter(models.EventType.user_id == user_id)
+    if after_id is not None:
+        query = query.filter(models.EventType.id > after_id)
+    return query.order_by(models.EventType.id).limit(limit).all()
+
 
+def iter_event_types(db: Session, user_id: Optional[int] = None, chunk_size: int = 500):
+    """
+    Streams event types (all tenants when user_id is None) in chunks of
+    `chunk_size` rows instead of loading the whole table.
+    """
+    query = db.query(models.EventType).options(*WITH_RULES)
+    if user_id is not None:
+        query = query.filter(models.EventType.user_id == user_id)
+    return query.order_by(models.EventType.id).yield_per(chunk_size)
 
-def get_event_type_by_slug(db: Session, slug: str) -> Optional[models.EventType]:
-    return db.query(models.EventType).filter(models.EventType.slug == slug).first()
 
+def get_event_type_by_slug(db: Session, slug: str, options=()) -> Optional[models.EventType]:
+    return db.query(models.EventType).options(*options).filter(models.EventType.slug == slug).first()
 
-def get_event_type(db: Session, event_type_id: int) -> Optional[models.EventType]:
-    return db.query(models.EventType).filter(models.EventType.id == event_type_id).first()
+
+def get_event_type(db: Session, event_type_id: int, options=WITH_RULES) -> Optional[models.EventType]:
+    return db.query(models.EventType).options(*options).filter(models.EventType.id == event_type_id).first()
 
 
 def update_event_type(
     db: Session, event_type: models.EventType, data: schemas.EventTypeUpdate
 ) -> models.EventType:
+    old_timezone = event_type_timezone(event_type)
     for field, value in data.dict(exclude_unset=True).items():
         setattr(event_type, field, value)
+    rezone_bookings(db, [event_type.id], old_timezone, event_type_timezone(event_type))
+    bump_event_type_version(event_type)
     db.commit()
     db.refresh(event_type)
     return event_type
 
 
 def delete_event_type(db: Session, event_type: models.EventType):
+    schedule_cache.invalidate(event_type.id)
+    db.execute(slot_days_delete_stmt(event_type.id))
     db.delete(event_type)
     db.commit()
 
 
 # ---------- Availability ----------
-def set_availability_rules(
+def replace_availability_rules(
     db: Session,
     event_type: models.EventType,
     rules: List[schemas.AvailabilityRuleCreate],
 ) -> List[models.AvailabilityRule]:
-    # delete existing
-    for r in list(event_type.availability_rules):
-        db.delete(r)
-    db.flush()
-
-    new_rules = []
-    for r in rules:
-        rule = models.AvailabilityRule(
-            event_type_id=event_type.id, **r.dict()
+    """
+    Makes the event type's rules equal to `rules` (validated and merged)
+    with as few writes as possible: unchanged rules are kept, removed ones
+    are deleted in one statement and new ones inserted in one batch.
+    Raises ValueError for invalid rules.
+    """
+    desired = normalize_rules(rules)
+    existing = list(event_type.availability_rules)  # usually eager-loaded with the event type
+
+    kept = []
+    to_delete = []
+    seen = set()
+    wanted = set(desired)
+    for rule in existing:
+        key = (rule.weekday, rule.start_time, rule.end_time)
+        if key in wanted and key not in seen:
+            kept.append(rule)
+            seen.add(key)
+        else:
+            to_delete.append(rule.id)
+    to_insert = [
+        {"event_type_id": event_type.id, "weekday": w, "start_time": st, "end_time": et}
+        for w, st, et in desired if (w, st, et) not in seen
+    ]
+
+    if not to_delete and not to_insert:
+        return kept
+
+    if to_delete:
+        db.execute(
+            delete(models.AvailabilityRule)
+            .where(models.AvailabilityRule.id.in_(to_delete))
+            # Drops the deleted rows from the session, so a reused id can't
+            # come back as the stale object from RETURNING below
+            .execution_options(synchronize_session="evaluate")
         )
-        db.add(rule)
-        new_rules.append(rule)
+    inserted = []
+    if to_insert:
+        if db.get_bind().dialect.insert_executemany_returning:
+            inserted = list(db.scalars(insert(models.AvailabilityRule).returning(models.AvailabilityRule), to_insert))
+        else:
+            db.execute(insert(models.AvailabilityRule), to_insert)
+
+    bump_event_type_version(event_type)
+    db.expire(event_type, ["availability_rules"])
+    # Kept and RETURNING rows are fully loaded; expiring them on commit
+    # would cost one refresh SELECT per rule when they are serialized.
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+    if to_insert and not inserted:
+        return db.query(models.AvailabilityRule).filter(
+            models.AvailabilityRule.event_type_id == event_type.id
+        ).order_by(models.AvailabilityRule.weekday, models.AvailabilityRule.start_time).all()
+    return sorted(kept + inserted, key=lambda r: (r.weekday, r.start_time))
+
+
+def set_availability_rules(
+    db: Session,
+    event_type: models.EventType,
+    rules: List[schemas.AvailabilityRuleCreate],
+) -> List[models.AvailabilityRule]:
+    return replace_availability_rules(db, event_type, rules)
 
-    db.commit()
-    for r in new_rules:
-        db.refresh(r)
-    return new_rules
 
 def update_availability_rules(
     db: Session,
     event_type: models.EventType,
     rules: List[schemas.AvailabilityRuleCreate],
 ) -> List[models.AvailabilityRule]:
-    
-    for existing_rule in list(event_type.availability_rules):
-        db.delete(existing_rule)
-    
-    db.flush() 
-
-    for r in rules:
-        rule = models.AvailabilityRule(
-            event_type_id=event_type.id, 
-            weekday=r.weekday,
-            start_time=r.start_time,
-            end_time=r.end_time
-        )
-        db.add(rule)
+    return replace_availability_rules(db, event_type, rules)
 
-    db.commit()
-    db.refresh(event_type)
-    return event_type.availability_rules
 
 # ---------- Booking ----------
+# Upper bound on a booking's length. It lets overlap queries put a lower
+# bound on start_datetime, so they are a bounded index range scan.
+MAX_BOOKING_DURATION = timedelta(hours=24)
+
+
+def _active_overlapping(event_type_id: int, start: datetime, end: datetime):
+    """
+    Filter for active bookings of an event type that overlap [start, end).
+    """
+    return (
+        models.Booking.event_type_id == event_type_id,
+        models.Booking.start_datetime < end,
+        models.Booking.start_datetime > start - MAX_BOOKING_DURATION,
+        models.Booking.end_datetime > start,
+        models.Booking.status != "cancelled",
+    )
+
+
+def rezone_bookings(db: Session, event_type_ids, old_timezone: str, new_timezone: str) -> int:
+    """
+    Bookings are stored as wall-clock time in their event type's zone. When
+    that zone changes, rewrites the bookings of `event_type_ids` (ids or a
+    subquery) so they keep their instants. Call before committing the change.
+    Returns the number of rewritten bookings.
+    """
+    if old_timezone == new_timezone:
+        return 0
+    rows = db.execute(
+        select(models.Booking.id, models.Booking.start_datetime, models.Booking.end_datetime)
+        .where(models.Booking.event_type_id.in_(event_type_ids))
+    ).all()
+    if rows:
+        now = datetime.utcnow()
+        db.execute(update(models.Booking), [
+            {
+                "id": booking_id,
+                "start_datetime": convert_wall_clock(start, old_timezone, new_timezone),
+                "end_datetime": convert_wall_clock(end, old_timezone, new_timezone),
+                "updated_at": now,
+            }
+            for booking_id, start, end in rows
+        ])
+    return len(rows)
+
+
+def get_active_booking_intervals(
+    db: Session, event_type_id: int, start: datetime, end: datetime
+) -> List[Tuple[datetime, datetime]]:
+    """
+    (start, end) of every active booking overlapping [start, end),
+    including ones that cross midnight. Served by ix_bookings_active_event_type_start.
+    """
+    return db.query(models.Booking.start_datetime, models.Booking.end_datetime).filter(
+        *_active_overlapping(event_type_id, start, end)
+    ).all()
+
+
 def create_booking(
     db: Session,
     event_type: models.EventType,
@@ -102,3 +260,209 @@ def create_booking(
     db.commit()
     db.refresh(booking)
     return booking
+
+
+def reserve_booking_stmt(event_type_id: int, data: schemas.BookingCreate):
+    """
+    INSERT ... SELECT ... WHERE NOT EXISTS (overlapping active booking)
+    RETURNING id. Yields no row when the slot is taken.
+    """
+    booking_table = models.Booking.__table__
+    values = {"event_type_id": event_type_id, "status": "pending", **data.dict()}
+    overlapping = select(models.Booking.id).where(
+        *_active_overlapping(event_type_id, data.start_datetime, data.end_datetime)
+    )
+    columns = list(values)
+    return insert(booking_table).from_select(
+        columns,
+        select(*[literal(values[c], booking_table.c[c].type) for c in columns]).where(~exists(overlapping)),
+    ).returning(booking_table.c.id)
+
+
+def create_booking_with_calendar_job(
+    db: Session,
+    event_type: models.EventType,
+    data: schemas.BookingCreate,
+) -> Optional[models.Booking]:
+    """
+    Atomically reserves the slot and stores a pending booking together with
+    the outbox job that will create its Google Calendar event.
+
+    The overlap check and the insert are one INSERT ... SELECT ... WHERE NOT
+    EXISTS statement, so two concurrent requests can't both pass the check
+    (SQLite serializes writers; on Postgres the bookings_no_overlap exclusion
+    constraint backs it up). Returns None if the slot is already taken.
+    """
+    try:
+        booking_id = db.execute(reserve_booking_stmt(event_type.id, data)).scalar()
+        if booking_id is None:
+            db.rollback()
+            return None
+        db.add(models.CalendarJob(booking_id=booking_id, action="create"))
+        mark_slot_days_dirty(db, event_type.id, data.start_datetime, data.end_datetime)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+
+    return db.get(models.Booking, booking_id)
+
+
+def bulk_insert_bookings(
+    db: Session, event_type_id: int, rows: List[dict], sync_calendar: bool = False
+) -> int:
+    """
+    Inserts already-validated booking rows as one executemany batch in a
+    single transaction. With sync_calendar the bookings are stored as pending
+    with an outbox job each, otherwise as confirmed without touching Google.
+    Overlaps are not checked: imports carry history that is taken as-is.
+    """
+    status = "pending" if sync_calendar else "confirmed"
+    values = [{**row, "event_type_id": event_type_id, "status": status} for row in rows]
+    if not values:
+        return 0
+    if not sync_calendar:
+        db.execute(insert(models.Booking), values)
+    else:
+        if db.get_bind().dialect.insert_executemany_returning:
+            booking_ids = list(db.scalars(insert(models.Booking).returning(models.Booking.id), values))
+        else:
+            booking_ids = [
+                db.execute(insert(models.Booking).returning(models.Booking.id), v).scalar()
+                for v in values
+            ]
+        db.execute(
+            insert(models.CalendarJob),
+            [{"booking_id": booking_id, "action": "create"} for booking_id in booking_ids],
+        )
+    mark_slot_days_dirty(
+        db, event_type_id,
+        min(v["start_datetime"] for v in values), max(v["end_datetime"] for v in values),
+    )
+    db.commit()
+    return len(values)
+
+
+def iter_bookings(db: Session, event_type_id: int, chunk_size: int = 500):
+    """
+    Streams an event type's bookings in start order, `chunk_size` rows at a time.
+    """
+    return db.query(models.Booking).filter(
+        models.Booking.event_type_id == event_type_id
+    ).order_by(models.Booking.start_datetime, models.Booking.id).yield_per(chunk_size)
+
+
+# ---------- Busy mirror ----------
+def get_busy_blocks(
+    db: Session, user_id: int, start: datetime, end: datetime
+) -> Optional[List[Tuple[datetime, datetime]]]:
+    """
+    Mirrored Google busy blocks (naive UTC) overlapping [start, end), or None
+    if the host's calendar hasn't been synced yet.
+    """
+    synced_at = db.query(models.CalendarSyncState.last_synced_at).filter(
+        models.CalendarSyncState.user_id == user_id
+    ).scalar()
+    if synced_at is None:
+        return None
+    return db.query(models.BusyBlock.start_utc, models.BusyBlock.end_utc).filter(
+        models.BusyBlock.user_id == user_id,
+        models.BusyBlock.start_utc < end,
+        models.BusyBlock.end_utc > start,
+    ).all()
+
+
+# ---------- Materialized slots ----------
+def slot_days_delete_stmt(event_type_id: int):
+    """
+    Stored days have no ORM relationship, and SQLite doesn't enforce ON DELETE
+    CASCADE; left behind, they'd be served for a new event type reusing the id.
+    """
+    return delete(models.SlotDay).where(models.SlotDay.event_type_id == event_type_id)
+
+
+def slot_days_dirty_stmt(event_type_id: int, first_day: date, last_day: date):
+    """
+    UPDATE marking the event type's materialized days in [first_day, last_day] as stale.
+    """
+    return update(models.SlotDay).where(
+        models.SlotDay.event_type_id == event_type_id,
+        models.SlotDay.day >= first_day,
+        models.SlotDay.day <= last_day,
+    ).values(is_dirty=True, dirtied_at=datetime.utcnow())
+
+
+def mark_slot_days_dirty(db: Session, event_type_id: int, start: datetime, end: datetime):
+    """
+    Call before committing a booking write that covers [start, end].
+    """
+    if config.SLOT_MATERIALIZATION_ENABLED:
+        db.execute(slot_days_dirty_stmt(event_type_id, start.date(), end.date()))
+
+
+def mark_host_slot_days_dirty(db: Session, user_id: int):
+    """
+    Marks every materialized day of the host's event types as stale,
+    e.g. after their Google busy blocks changed.
+    """
+    if config.SLOT_MATERIALIZATION_ENABLED:
+        owned = select(models.EventType.id).where(models.EventType.user_id == user_id)
+        db.execute(
+            update(models.SlotDay)
+            .where(models.SlotDay.event_type_id.in_(owned))
+            .values(is_dirty=True, dirtied_at=datetime.utcnow())
+        )
+
+
+def slot_days_query(slug: str, first_day: date, last_day: date):
+    return select(models.SlotDay, models.EventType.version).join(
+        models.EventType, models.EventType.id == models.SlotDay.event_type_id
+    ).where(
+        models.EventType.slug == slug,
+        models.EventType.is_active.is_(True),
+        models.SlotDay.day >= first_day,
+        models.SlotDay.day <= last_day,
+    ).order_by(models.SlotDay.day)
+
+
+def get_slot_days(db: Session, slug: str, first_day: date, last_day: date) -> List[Tuple[models.SlotDay, int]]:
+    """
+    Materialized days of the active event type `slug` with its current version,
+    in one primary-key range lookup.
+    """
+    return [tuple(row) for row in db.execute(slot_days_query(slug, first_day, last_day)).all()]
+
+
+# ---------- HTTP validators ----------
+def slots_validator_query(slug: str, start: datetime, end: datetime):
+    """
+    One row with everything the public slots for [start, end) depend on:
+    the event type version, a count / last change of its bookings in the
+    window (any status, so cancellations count too) and the host's last
+    busy-mirror change.
+    """
+    in_window = (
+        models.Booking.event_type_id == models.EventType.id,
+        models.Booking.start_datetime < end,
+        models.Booking.start_datetime > start - MAX_BOOKING_DURATION,
+        models.Booking.end_datetime > start,
+    )
+    booking_count = select(func.count(models.Booking.id)).where(*in_window).scalar_subquery()
+    booking_changed = select(func.max(models.Booking.updated_at)).where(*in_window).scalar_subquery()
+    return select(
+        models.EventType.id,
+        models.EventType.version,
+        booking_count,
+        booking_changed,
+        models.CalendarSyncState.busy_changed_at,
+    ).outerjoin(
+        models.CalendarSyncState, models.CalendarSyncState.user_id == models.EventType.user_id
+    ).where(
+        models.EventType.slug == slug,
+        models.EventType.is_active.is_(True),
+    )
+
+
+def get_slots_validator(db: Session, slug: str, start: datetime, end: datetime) -> Optional[tuple]:
+    row = db.execute(slots_validator_query(slug, start, end)).first()
+    return tuple(row) if row else None
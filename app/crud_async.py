@@ -0,0 +1,194 @@
+"""
+AsyncSession equivalents of crud.py.
+
+AsyncSession can't lazy-load relationships, so every function that hands
+an EventType back to a route loads the relationships the route will touch.
+"""
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from . import config, crud, models, schemas
+from .crud import (
+    _active_overlapping, bump_event_type_version, reserve_booking_stmt, rezone_bookings, slot_days_delete_stmt,
+    slot_days_dirty_stmt, slot_days_query, slots_validator_query,
+)
+from .services.schedule import schedule_cache
+from .services.timezones import event_type_timezone
+
+
+def _event_type_query():
+    return select(models.EventType).options(
+        selectinload(models.EventType.availability_rules),
+        joinedload(models.EventType.owner),
+    )
+
+
+# ---------- EventType ----------
+async def create_event_type(db: AsyncSession, data: schemas.EventTypeCreate, user_id: int) -> models.EventType:
+    et = models.EventType(**data.dict(), user_id=user_id)
+    db.add(et)
+    await db.commit()
+    return await get_event_type(db, et.id)
+
+
+async def get_event_types(
+    db: AsyncSession, user_id: int, after_id: Optional[int] = None, limit: int = 50
+) -> List[models.EventType]:
+    stmt = (
+        select(models.EventType)
+        .options(selectinload(models.EventType.availability_rules))
+        .where(models.EventType.user_id == user_id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(models.EventType.id > after_id)
+    result = await db.execute(stmt.order_by(models.EventType.id).limit(limit))
+    return list(result.scalars().all())
+
+
+async def get_event_type_by_slug(db: AsyncSession, slug: str) -> Optional[models.EventType]:
+    result = await db.execute(_event_type_query().where(models.EventType.slug == slug))
+    return result.scalars().first()
+
+
+async def get_event_type(db: AsyncSession, event_type_id: int) -> Optional[models.EventType]:
+    result = await db.execute(
+        _event_type_query()
+        .where(models.EventType.id == event_type_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def update_event_type(
+    db: AsyncSession, event_type: models.EventType, data: schemas.EventTypeUpdate
+) -> models.EventType:
+    old_timezone = event_type_timezone(event_type)
+    for field, value in data.dict(exclude_unset=True).items():
+        setattr(event_type, field, value)
+    await db.run_sync(rezone_bookings, [event_type.id], old_timezone, event_type_timezone(event_type))
+    bump_event_type_version(event_type)
+    await db.commit()
+    return await get_event_type(db, event_type.id)
+
+
+async def delete_event_type(db: AsyncSession, event_type: models.EventType):
+    schedule_cache.invalidate(event_type.id)
+    await db.execute(slot_days_delete_stmt(event_type.id))
+    await db.delete(event_type)
+    await db.commit()
+
+
+# ---------- Availability ----------
+async def set_availability_rules(
+    db: AsyncSession,
+    event_type: models.EventType,
+    rules: List[schemas.AvailabilityRuleCreate],
+) -> List[models.AvailabilityRule]:
+    # The diffing logic is shared with the sync path and runs on the async connection.
+    return await db.run_sync(crud.replace_availability_rules, event_type, rules)
+
+
+async def update_availability_rules(
+    db: AsyncSession,
+    event_type: models.EventType,
+    rules: List[schemas.AvailabilityRuleCreate],
+) -> List[models.AvailabilityRule]:
+    return await set_availability_rules(db, event_type, rules)
+
+
+# ---------- Booking ----------
+async def get_active_booking_intervals(
+    db: AsyncSession, event_type_id: int, start: datetime, end: datetime
+) -> List[Tuple[datetime, datetime]]:
+    result = await db.execute(
+        select(models.Booking.start_datetime, models.Booking.end_datetime).where(
+            *_active_overlapping(event_type_id, start, end)
+        )
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def create_booking(
+    db: AsyncSession,
+    event_type: models.EventType,
+    data: schemas.BookingCreate,
+) -> models.Booking:
+    booking = models.Booking(
+        event_type_id=event_type.id,
+        **data.dict(),
+    )
+    db.add(booking)
+    await db.commit()
+    await db.refresh(booking)
+    return booking
+
+
+async def create_booking_with_calendar_job(
+    db: AsyncSession,
+    event_type: models.EventType,
+    data: schemas.BookingCreate,
+) -> Optional[models.Booking]:
+    """
+    See crud.create_booking_with_calendar_job.
+    """
+    try:
+        booking_id = (await db.execute(reserve_booking_stmt(event_type.id, data))).scalar()
+        if booking_id is None:
+            await db.rollback()
+            return None
+        db.add(models.CalendarJob(booking_id=booking_id, action="create"))
+        if config.SLOT_MATERIALIZATION_ENABLED:
+            await db.execute(slot_days_dirty_stmt(
+                event_type.id, data.start_datetime.date(), data.end_datetime.date()
+            ))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+
+    return await db.get(models.Booking, booking_id)
+
+
+# ---------- User ----------
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+
+# ---------- Busy mirror ----------
+async def get_busy_blocks(
+    db: AsyncSession, user_id: int, start: datetime, end: datetime
+) -> Optional[List[Tuple[datetime, datetime]]]:
+    """
+    See crud.get_busy_blocks.
+    """
+    synced_at = (await db.execute(
+        select(models.CalendarSyncState.last_synced_at).where(models.CalendarSyncState.user_id == user_id)
+    )).scalar()
+    if synced_at is None:
+        return None
+    result = await db.execute(
+        select(models.BusyBlock.start_utc, models.BusyBlock.end_utc).where(
+            models.BusyBlock.user_id == user_id,
+            models.BusyBlock.start_utc < end,
+            models.BusyBlock.end_utc > start,
+        )
+    )
+    return [tuple(row) for row in result.all()]
+
+
+# ---------- Materialized slots ----------
+async def get_slot_days(
+    db: AsyncSession, slug: str, first_day: date, last_day: date
+) -> List[Tuple[models.SlotDay, int]]:
+    result = await db.execute(slot_days_query(slug, first_day, last_day))
+    return [tuple(row) for row in result.all()]
+
+
+# ---------- HTTP validators ----------
+async def get_slots_validator(db: AsyncSession, slug: str, start: datetime, end: datetime) -> Optional[tuple]:
+    row = (await db.execute(slots_validator_query(slug, start, end))).first()
+    return tuple(row) if row else None
@@ -1,16 +1,171 @@
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Union
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./kalendly.db"
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+from . import config
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts SQL statements issued in this context (including threadpool work
+    started from it, which inherits the context):
+
+        with count_queries() as counter:
+            ...
+        counter.count
+    """
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+def normalize_database_url(url: str) -> str:
+    # Render/Heroku hand out postgres:// URLs, which SQLAlchemy 2 no longer accepts
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def to_async_url(url: str) -> str:
+    """
+    Maps a sync URL to its async driver: asyncpg for Postgres, aiosqlite for SQLite.
+    """
+    url = normalize_database_url(url)
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _enable_sqlite_pragmas(engine: Engine):
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if config.SQLITE_WAL:
+            # WAL lets readers run while a writer holds the lock
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+def is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+
+
+def make_engine(url: str) -> Engine:
+    """
+    Builds an engine for `url`: a pooled engine for server databases,
+    or a WAL-mode SQLite engine with a busy timeout for local use.
+    """
+    url = normalize_database_url(url)
+    if url.startswith("sqlite"):
+        if is_sqlite_memory(url):
+            # One shared connection, so every thread sees the same in-memory database
+            pool_args = {"poolclass": StaticPool}
+        else:
+            pool_args = {
+                "pool_size": config.DB_POOL_SIZE,
+                "max_overflow": config.DB_MAX_OVERFLOW,
+                "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+            }
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+            **pool_args,
+        )
+        _enable_sqlite_pragmas(engine)
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    """
+    Async counterpart of make_engine, with the same pool and SQLite settings.
+    """
+    url = to_async_url(url)
+    if url.startswith("sqlite"):
+        engine = create_async_engine(
+            url, connect_args={"timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        )
+        _enable_sqlite_pragmas(engine.sync_engine)
+        return engine
+
+    return create_async_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+
+
+SQLALCHEMY_DATABASE_URL = normalize_database_url(config.DATABASE_URL)
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Reads that can tolerate replication lag go to the replica when one is configured
+replica_engine = make_engine(config.DATABASE_REPLICA_URL) if config.DATABASE_REPLICA_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+# Async engines are only built when DB_ASYNC is on, so their drivers stay optional
+if config.DB_ASYNC:
+    async_engine = make_async_engine(SQLALCHEMY_DATABASE_URL)
+    async_replica_engine = (
+        make_async_engine(config.DATABASE_REPLICA_URL) if config.DATABASE_REPLICA_URL else async_engine
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, expire_on_commit=False, autoflush=False)
+else:
+    async_engine = async_replica_engine = None
+    AsyncSessionLocal = AsyncReadSessionLocal = None
+
 Base = declarative_base()
 
+AnySession = Union[Session, AsyncSession]
+
 
 def get_db():
     from fastapi import Depends  # avoid circular imports
@@ -19,3 +174,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_session():
+    """
+    Session for async routes: an AsyncSession when DB_ASYNC is on,
+    otherwise a sync Session that the route drives from the threadpool.
+    """
+    if config.DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_read_session():
+    if config.DB_ASYNC:
+        async with AsyncReadSessionLocal() as db:
+            yield db
+    else:
+        db = ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def dispose_async_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+    if async_replica_engine is not None and async_replica_engine is not async_engine:
+        await async_replica_engine.dispose()
@@ -1,12 +1,43 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from .db import Base, engine
-from .api import event_types, availability, public, auth
+from .db import Base, engine, count_queries, dispose_async_engines
+from .api import event_types, availability, bookings, public, auth, admin, webhooks
+from . import config
+from .migrations import run_migrations
+from .services.google_tokens import token_refresher
+from .services.calendar_worker import calendar_worker
+from .services.calendar_sync import calendar_syncer
+from .services.slot_store import slot_materializer
+from .services.google_calendar_async import close_http_client
+from .services.metrics import collect_stage_timings, metrics_payload, observe_request, server_timing_header
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
-app = FastAPI(title="Kalendly Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.TOKEN_REFRESHER_ENABLED:
+        token_refresher.start()
+    if config.CALENDAR_WORKER_INPROCESS:
+        calendar_worker.start()
+    if config.CALENDAR_SYNC_ENABLED:
+        calendar_syncer.start()
+    if config.SLOT_MATERIALIZATION_ENABLED and config.SLOT_MATERIALIZER_INPROCESS:
+        slot_materializer.start()
+    yield
+    slot_materializer.stop()
+    calendar_syncer.stop()
+    calendar_worker.stop()
+    token_refresher.stop()
+    await close_http_client()
+    await dispose_async_engines()
+
+
+app = FastAPI(title="Kalendly Backend", lifespan=lifespan)
 origins = [
     "http://localhost:5173", # Vite default
     "http://localhost:3000", # Create React App default
@@ -21,13 +52,45 @@ app.add_middleware(
     allow_headers=["*"],         # Allows all headers
 )
 
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    with collect_stage_timings() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    observe_request(request.method, getattr(route, "path", "unmatched"), response.status_code, elapsed)
+    if config.SERVER_TIMING_HEADER:
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+if config.DB_QUERY_COUNT_HEADER:
+    @app.middleware("http")
+    async def db_query_count_header(request: Request, call_next):
+        with count_queries() as counter:
+            response = await call_next(request)
+        response.headers["X-DB-Query-Count"] = str(counter.count)
+        return response
+
 app.include_router(auth.router)
 
 app.include_router(event_types.router)
 app.include_router(availability.router)
+app.include_router(bookings.router)
 app.include_router(public.router)
+app.include_router(admin.router)
+app.include_router(webhooks.router)
 
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    payload = metrics_payload()
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Metrics are not enabled")
+    body, content_type = payload
+    return Response(content=body, media_type=content_type)
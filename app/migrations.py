@@ -0,0 +1,70 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .db import Base
+
+# Columns added to existing tables after their first release: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ("users", "google_token_expiry", "TIMESTAMP"),
+    ("event_types", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("bookings", "updated_at", "TIMESTAMP"),
+    ("calendar_sync_states", "busy_changed_at", "TIMESTAMP"),
+    ("users", "timezone", "VARCHAR"),
+    ("event_types", "timezone", "VARCHAR"),
+    ("users", "google_last_used_at", "TIMESTAMP"),
+    ("users", "google_refresh_failures", "INTEGER NOT NULL DEFAULT 0"),
+    ("users", "google_refresh_retry_at", "TIMESTAMP"),
+]
+
+# Postgres-only: rejects overlapping active bookings even under concurrent inserts
+BOOKINGS_NO_OVERLAP = """
+ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlap EXCLUDE USING gist (
+    event_type_id WITH =,
+    tsrange(start_datetime, end_datetime) WITH &&
+) WHERE (status <> 'cancelled')
+"""
+
+
+def _add_columns(engine: Engine):
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if not insp.has_table(table):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_indexes(engine: Engine):
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def _add_booking_exclusion_constraint(engine: Engine):
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            found = conn.execute(
+                text("SELECT 1 FROM pg_constraint WHERE conname = 'bookings_no_overlap'")
+            ).first()
+            if found:
+                return
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+            conn.execute(text(BOOKINGS_NO_OVERLAP))
+    except Exception as e:
+        print(f"WARNING: could not add bookings_no_overlap constraint: {e}")
+
+
+def run_migrations(engine: Engine):
+    """
+    Brings an existing database up to date with the models.
+    create_all() only creates missing tables, so later schema changes
+    (columns, indexes, constraints) are applied here. Every step is idempotent.
+    """
+    _add_columns(engine)
+    _create_indexes(engine)
+    _add_booking_exclusion_constraint(engine)
@@ -1,5 +1,6 @@
 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from .db import Base
 
@@ -16,6 +17,10 @@ class EventType(Base):
     min_notice_minutes = Column(Integer, default=60)
     buffer_minutes = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
+    # IANA zone of the rules and stored bookings; falls back to the host's zone
+    timezone = Column(String, nullable=True)
+    # Bumped whenever rules, duration, buffer or zone change; keys compiled schedules
+    version = Column(Integer, nullable=False, default=1)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="event_types")
     availability_rules = relationship(
@@ -38,6 +43,17 @@ class AvailabilityRule(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_event_type_start", "event_type_id", "start_datetime"),
+        # Status-aware variant for slot lookups and the reservation overlap check:
+        # only active bookings, and covering (start, end) so no table lookups are needed.
+        Index(
+            "ix_bookings_active_event_type_start",
+            "event_type_id", "start_datetime", "end_datetime",
+            sqlite_where=text("status != 'cancelled'"),
+            postgresql_where=text("status != 'cancelled'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     event_type_id = Column(Integer, ForeignKey("event_types.id"), nullable=False)
@@ -48,7 +64,9 @@ class Booking(Base):
     invitee_note = Column(String, nullable=True)
     status = Column(String, default="confirmed")
     gcal_event_id = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
     event_type = relationship("EventType", back_populates="bookings")
+    calendar_jobs = relationship("CalendarJob", back_populates="booking", cascade="all, delete-orphan")
 
 class User(Base):
     __tablename__ = "users"
@@ -57,4 +75,82 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     google_access_token = Column(String, nullable=True)
     google_refresh_token = Column(String, nullable=True)
-    event_types = relationship("EventType", back_populates="owner")
\ No newline at end of file
+    google_token_expiry = Column(DateTime, nullable=True)  # naive UTC, as used by google-auth
+    google_last_used_at = Column(DateTime, nullable=True)  # last request that needed Google; throttled
+    google_refresh_failures = Column(Integer, nullable=False, default=0)  # consecutive background refresh failures
+    google_refresh_retry_at = Column(DateTime, nullable=True)  # background refresh backs off until then
+    timezone = Column(String, nullable=True)  # IANA zone, default for the user's event types
+    event_types = relationship("EventType", back_populates="owner")
+
+
+class CalendarJob(Base):
+    """
+    Outbox row for Google Calendar work that must happen after a booking is committed.
+    """
+    __tablename__ = "calendar_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False)
+    action = Column(String, nullable=False, default="create")
+    status = Column(String, nullable=False, default="pending", index=True)  # pending / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    booking = relationship("Booking", back_populates="calendar_jobs")
+
+
+class BusyBlock(Base):
+    """
+    Local mirror of one busy event on a host's primary Google calendar,
+    kept up to date by services.calendar_sync.
+    """
+    __tablename__ = "busy_blocks"
+    __table_args__ = (
+        UniqueConstraint("user_id", "gcal_event_id", name="uq_busy_blocks_user_event"),
+        Index("ix_busy_blocks_user_start", "user_id", "start_utc", "end_utc"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    gcal_event_id = Column(String, nullable=False)
+    start_utc = Column(DateTime, nullable=False)  # naive UTC
+    end_utc = Column(DateTime, nullable=False)
+
+
+class CalendarSyncState(Base):
+    """
+    Per-host incremental sync position (events.list sync token) and
+    the Google watch channel that pushes change notifications.
+    """
+    __tablename__ = "calendar_sync_states"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sync_token = Column(String, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)
+    last_full_sync_at = Column(DateTime, nullable=True)
+    busy_changed_at = Column(DateTime, nullable=True)  # last sync that changed busy_blocks
+    channel_id = Column(String, nullable=True, unique=True)
+    channel_resource_id = Column(String, nullable=True)
+    channel_token = Column(String, nullable=True)
+    channel_expires_at = Column(DateTime, nullable=True)
+
+
+class SlotDay(Base):
+    """
+    Materialized free slots of one event type on one day (see services.slot_store).
+    A row is served only while it is clean, fresh and built from the
+    event type's current version.
+    """
+    __tablename__ = "slot_days"
+
+    event_type_id = Column(Integer, ForeignKey("event_types.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    version = Column(Integer, nullable=False)  # EventType.version the slots were built from
+    duration_minutes = Column(Integer, nullable=False)
+    slots = Column(String, nullable=False, default="")  # comma-separated start offsets in minutes
+    is_dirty = Column(Boolean, nullable=False, default=True)
+    dirtied_at = Column(DateTime, nullable=True)
+    computed_at = Column(DateTime, nullable=True)
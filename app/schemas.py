@@ -1,9 +1,23 @@
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 
 
+# ---------- User ----------
+class UserRead(BaseModel):
+    id: int
+    email: Optional[str] = None
+    timezone: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
+class UserUpdate(BaseModel):
+    timezone: Optional[str] = None  # IANA name; None falls back to the server default
+
+
 # ---------- Availability ----------
 class AvailabilityRuleBase(BaseModel):
     weekday: int  # 0-6
@@ -32,6 +46,7 @@ class EventTypeBase(BaseModel):
     min_notice_minutes: int = 60
     buffer_minutes: int = 0
     is_active: bool = True
+    timezone: Optional[str] = None  # IANA name; defaults to the host's zone
 
 
 class EventTypeCreate(EventTypeBase):
@@ -46,6 +61,7 @@ class EventTypeUpdate(BaseModel):
     min_notice_minutes: Optional[int] = None
     buffer_minutes: Optional[int] = None
     is_active: Optional[bool] = None
+    timezone: Optional[str] = None
 
 
 class EventTypeRead(EventTypeBase):
@@ -86,6 +102,7 @@ class PublicEventTypeRead(BaseModel):
     duration_minutes: int
     location_type: str
     host_name: str
+    timezone: str
     class Config:
         orm_mode = True
 
@@ -93,3 +110,9 @@ class PublicEventTypeRead(BaseModel):
 class TimeSlot(BaseModel):
     start: datetime
     end: datetime
+
+
+
+class DaySlots(BaseModel):
+    date: date
+    slots: List[TimeSlot]
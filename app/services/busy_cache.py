@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from .. import config
+
+
+class InProcessBackend:
+    """
+    LRU + TTL store living in the current process.
+    Entries are indexed by user so a booking can drop all of a host's windows.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, list]]" = OrderedDict()
+        self._by_user: Dict[int, Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Tuple, value: list, ttl: int):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def _remove(self, key: Tuple):
+        self._entries.pop(key, None)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+
+class RedisBackend:
+    """
+    Shared store for multi-worker deployments.
+    Invalidation bumps a per-user generation number that is part of every key,
+    so old windows simply stop being read and expire on their own TTL.
+    """
+
+    PREFIX = "kalendly:busy"
+
+    def __init__(self, url: str):
+        import redis  # optional dependency
+
+        self._redis = redis.Redis.from_url(url)
+        self.evictions = 0
+
+    def _key(self, key: Tuple) -> str:
+        user_id, start, end = key
+        gen = int(self._redis.get(f"{self.PREFIX}:gen:{user_id}") or 0)
+        return f"{self.PREFIX}:{user_id}:{gen}:{start}:{end}"
+
+    def get(self, key: Tuple) -> Optional[list]:
+        raw = self._redis.get(self._key(key))
+        if raw is None:
+            return None
+        return [
+            {"start": datetime.fromisoformat(i["start"]), "end": datetime.fromisoformat(i["end"])}
+            for i in json.loads(raw)
+        ]
+
+    def set(self, key: Tuple, value: list, ttl: int):
+        payload = json.dumps(
+            [{"start": i["start"].isoformat(), "end": i["end"].isoformat()} for i in value]
+        )
+        self._redis.set(self._key(key), payload, ex=ttl)
+
+    def delete_user(self, user_id: int):
+        self._redis.incr(f"{self.PREFIX}:gen:{user_id}")
+
+
+class BusyCache:
+    """
+    Caches Google free/busy results per host and time window.
+    """
+
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(user_id: int, start_dt: datetime, end_dt: datetime) -> Tuple:
+        return (user_id, start_dt.isoformat(), end_dt.isoformat())
+
+    def get(self, user_id: int, start_dt: datetime, end_dt: datetime) -> Optional[List[dict]]:
+        try:
+            value = self.backend.get(self._key(user_id, start_dt, end_dt))
+        except Exception as e:
+            print(f"Busy cache read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, user_id: int, start_dt: datetime, end_dt: datetime, busy: List[dict]):
+        try:
+            self.backend.set(self._key(user_id, start_dt, end_dt), busy, self.ttl_seconds)
+        except Exception as e:
+            print(f"Busy cache write failed: {e}")
+
+    def invalidate_user(self, user_id: int):
+        try:
+            self.backend.delete_user(user_id)
+        except Exception as e:
+            print(f"Busy cache invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+        }
+
+
+def _make_cache() -> Optional[BusyCache]:
+    if not config.BUSY_CACHE_ENABLED:
+        return None
+    if config.BUSY_CACHE_BACKEND == "redis":
+        if not config.REDIS_URL:
+            raise RuntimeError("BUSY_CACHE_BACKEND=redis requires REDIS_URL")
+        backend = RedisBackend(config.REDIS_URL)
+    else:
+        backend = InProcessBackend(config.BUSY_CACHE_MAX_ENTRIES)
+    return BusyCache(backend, config.BUSY_CACHE_TTL_SECONDS)
+
+
+busy_cache = _make_cache()
@@ -0,0 +1,203 @@
+"""
+Batched Google Calendar sync.
+
+Brings a host's primary calendar in line with their bookings using
+Google's batch endpoint: up to GOOGLE_BATCH_SIZE inserts, updates and
+deletes travel in one HTTP request and each item's result is handled on
+its own. Used for backfills and for resyncing after a host reconnects.
+
+    python -m app.cli resync --email host@example.com
+"""
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .. import config, models
+from ..db import SessionLocal
+from .google_calendar import booking_event_id, build_event_body, get_google_client, invalidate_busy_intervals
+from .metrics import google_call
+
+MAX_REPORTED_ERRORS = 100
+# Google answers these when the event no longer exists
+GONE_STATUSES = (404, 410)
+# Google answers this when an event with the requested id already exists
+DUPLICATE_STATUS = 409
+
+
+def _plan(booking: models.Booking, update_existing: bool, queued: Set[int]) -> Optional[str]:
+    if booking.status == "cancelled":
+        return "delete" if booking.gcal_event_id else None
+    if booking.status == "pending" and booking.id in queued:
+        return None  # still owned by the calendar outbox worker
+    if not booking.gcal_event_id:
+        return "insert"
+    return "update" if update_existing else None
+
+
+def _request_for(service, action: str, booking: models.Booking):
+    # A resync mirrors existing bookings, so attendees aren't notified again.
+    events = service.events()
+    if action in ("insert", "recreate"):
+        body = build_event_body(booking, booking.event_type)
+        if action == "insert":
+            # Same id as the outbox worker uses, so an event it already
+            # created is recognised instead of duplicated. A deleted event
+            # keeps its id reserved, so a recreated one gets a new id.
+            body["id"] = booking_event_id(booking)
+        return events.insert(
+            calendarId="primary", body=body, conferenceDataVersion=1, sendUpdates="none"
+        )
+    if action == "update":
+        body = build_event_body(booking, booking.event_type)
+        body.pop("conferenceData")
+        return events.patch(
+            calendarId="primary", eventId=booking.gcal_event_id, body=body, sendUpdates="none"
+        )
+    return events.delete(calendarId="primary", eventId=booking.gcal_event_id, sendUpdates="none")
+
+
+def _status_of(exception) -> Optional[int]:
+    resp = getattr(exception, "resp", None)
+    return getattr(resp, "status", None)
+
+
+def _run_batch(client, items: List[Tuple[str, models.Booking]]) -> dict:
+    """
+    Sends one batch HTTP request. Returns {booking_id: (response, exception)}.
+    """
+    results = {}
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    batch = client.service.new_batch_http_request(callback=callback)
+    for action, booking in items:
+        batch.add(_request_for(client.service, action, booking), request_id=str(booking.id))
+    with google_call("batch"):
+        client.execute(batch)
+    return results
+
+
+def _sync(db: Session, client, work: List[Tuple[str, models.Booking]], summary: dict) -> List[models.Booking]:
+    """
+    Runs `work` in batches, writing gcal_event_id changes back in bulk after
+    each batch. Returns bookings whose Google event had disappeared.
+    """
+    gone = []
+    for i in range(0, len(work), config.GOOGLE_BATCH_SIZE):
+        chunk = work[i:i + config.GOOGLE_BATCH_SIZE]
+        try:
+            results = _run_batch(client, chunk)
+        except Exception as e:
+            results = {booking.id: (None, e) for _, booking in chunk}
+
+        changes = []
+        for action, booking in chunk:
+            response, exception = results.get(booking.id, (None, Exception("No response in batch")))
+            status = _status_of(exception)
+            if exception is None and action in ("insert", "recreate"):
+                # Pending bookings whose outbox job gave up are confirmed here
+                changes.append({"id": booking.id, "gcal_event_id": response["id"], "status": "confirmed"})
+                summary["created"] += 1
+            elif action == "insert" and status == DUPLICATE_STATUS:
+                changes.append({"id": booking.id, "gcal_event_id": booking_event_id(booking), "status": "confirmed"})
+                summary["created"] += 1
+            elif exception is None and action == "update":
+                summary["updated"] += 1
+            elif action == "delete" and (exception is None or status in GONE_STATUSES):
+                changes.append({"id": booking.id, "gcal_event_id": None})
+                summary["deleted"] += 1
+            elif action == "update" and status in GONE_STATUSES:
+                changes.append({"id": booking.id, "gcal_event_id": None})
+                gone.append(booking)
+            else:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"booking_id": booking.id, "action": action, "error": str(exception)[:500]})
+
+        if changes:
+            db.execute(update(models.Booking), changes)
+            db.commit()
+            by_id = {booking.id: booking for _, booking in chunk}
+            for change in changes:
+                # Mirror the bulk UPDATE on the loaded objects without dirtying them.
+                for key, value in change.items():
+                    if key != "id":
+                        set_committed_value(by_id[change["id"]], key, value)
+    return gone
+
+
+def _load_page(db: Session, user_id: int, since: Optional[datetime], after_id: int, limit: int):
+    query = db.query(models.Booking).join(models.Booking.event_type).options(
+        contains_eager(models.Booking.event_type)
+    ).filter(
+        models.EventType.user_id == user_id,
+        models.Booking.id > after_id,
+    )
+    if since is not None:
+        query = query.filter(models.Booking.start_datetime >= since)
+    return query.order_by(models.Booking.id).limit(limit).all()
+
+
+def _queued_booking_ids(db: Session, bookings: List[models.Booking]) -> Set[int]:
+    """
+    Ids of the pending bookings among `bookings` that still have a pending or
+    running outbox job. The others' jobs failed for good, so nothing else
+    will create their events.
+    """
+    pending = [b.id for b in bookings if b.status == "pending"]
+    if not pending:
+        return set()
+    return set(db.scalars(
+        select(models.CalendarJob.booking_id).where(
+            models.CalendarJob.booking_id.in_(pending),
+            models.CalendarJob.status.in_(("pending", "running")),
+        )
+    ))
+
+
+def resync_user(user_id: int, since: Optional[datetime] = None, update_existing: bool = True) -> dict:
+    """
+    Creates missing events, updates existing ones (unless update_existing is
+    False) and deletes events of cancelled bookings for every booking of the
+    host starting at or after `since`. Events that vanished from Google are
+    recreated, and pending bookings whose outbox job failed permanently get
+    their event and are confirmed. Returns counts plus the first per-item errors.
+    """
+    summary = {"created": 0, "updated": 0, "deleted": 0, "skipped": 0, "failed": 0, "errors": []}
+    # Keep loaded bookings usable across the per-batch commits.
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        user = db.get(models.User, user_id)
+        if user is None:
+            raise ValueError(f"User {user_id} not found")
+        if not user.google_access_token:
+            raise ValueError("User is not connected to Google Calendar")
+        client = get_google_client(user)
+
+        after_id = 0
+        while True:
+            page = _load_page(db, user_id, since, after_id, config.CALENDAR_RESYNC_PAGE_SIZE)
+            if not page:
+                break
+            after_id = page[-1].id
+
+            queued = _queued_booking_ids(db, page)
+            work = []
+            for booking in page:
+                action = _plan(booking, update_existing, queued)
+                if action is None:
+                    summary["skipped"] += 1
+                else:
+                    work.append((action, booking))
+            gone = _sync(db, client, work, summary)
+            if gone:
+                _sync(db, client, [("recreate", booking) for booking in gone], summary)
+
+        invalidate_busy_intervals(user)
+    finally:
+        db.close()
+    return summary
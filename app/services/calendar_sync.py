@@ -0,0 +1,313 @@
+"""
+Incremental mirror of hosts' Google busy time.
+
+Each host's primary calendar is copied into busy_blocks with events.list:
+one full listing, then only the changes since the returned sync token.
+Google push notifications (watch channels) mark a host dirty so changes
+are pulled within seconds; a periodic poll covers hosts without a channel.
+A full resync happens only when Google expires the sync token (410 Gone).
+
+With BUSY_SOURCE=mirror the slot routes read busy_blocks instead of
+calling freebusy on every request.
+"""
+import hmac
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from .. import config, crud, models
+from ..db import SessionLocal
+from .busy_cache import busy_cache
+from .google_calendar import DEFAULT_TIMEZONE, get_google_client
+from .metrics import google_call
+from .slot_store import slot_materializer
+from .timezones import get_zone
+
+PAGE_SIZE = 250
+# Events that ended before this are not worth mirroring
+KEEP_PAST = timedelta(days=1)
+
+
+def _status_of(exception) -> Optional[int]:
+    resp = getattr(exception, "resp", None)
+    return getattr(resp, "status", None)
+
+
+def _to_utc(value: dict, calendar_tz: str) -> Optional[datetime]:
+    """
+    Converts an event start/end ({'dateTime'} or all-day {'date'}) to naive UTC.
+    """
+    tz = get_zone(value.get("timeZone") or calendar_tz)
+    if "dateTime" in value:
+        dt = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=tz)
+    elif "date" in value:
+        dt = datetime.fromisoformat(value["date"]).replace(tzinfo=tz)
+    else:
+        return None
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_busy_event(event: dict, calendar_tz: str) -> Optional[Tuple[datetime, datetime]]:
+    """
+    (start, end) in naive UTC if the event blocks time, the way freebusy
+    counts it; None for cancelled, 'free' (transparent) or declined events.
+    """
+    if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+        return None
+    for attendee in event.get("attendees", []):
+        if attendee.get("self") and attendee.get("responseStatus") == "declined":
+            return None
+    start = _to_utc(event.get("start", {}), calendar_tz)
+    end = _to_utc(event.get("end", {}), calendar_tz)
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def _apply_events(db: Session, user_id: int, events: Iterable[dict], calendar_tz: str) -> int:
+    """
+    Replaces the mirrored rows of the given events: one bulk delete plus one
+    bulk insert of those that still block time. Returns the number of events seen.
+    """
+    events = list(events)
+    if not events:
+        return 0
+    db.execute(
+        delete(models.BusyBlock).where(
+            models.BusyBlock.user_id == user_id,
+            models.BusyBlock.gcal_event_id.in_([e["id"] for e in events]),
+        )
+    )
+    cutoff = datetime.utcnow() - KEEP_PAST
+    rows = {}
+    for event in events:
+        interval = parse_busy_event(event, calendar_tz)
+        if interval is not None and interval[1] > cutoff:
+            rows[event["id"]] = {
+                "user_id": user_id, "gcal_event_id": event["id"],
+                "start_utc": interval[0], "end_utc": interval[1],
+            }
+    if rows:
+        db.execute(insert(models.BusyBlock), list(rows.values()))
+    return len(events)
+
+
+def _pull(db: Session, client, state: models.CalendarSyncState, full: bool) -> int:
+    if full:
+        db.execute(delete(models.BusyBlock).where(models.BusyBlock.user_id == state.user_id))
+    params = {"calendarId": "primary", "singleEvents": True, "maxResults": PAGE_SIZE}
+    if not full:
+        params["syncToken"] = state.sync_token
+
+    changed = 0
+    page_token = None
+    while True:
+        with google_call("events.list"):
+            response = client.execute(client.service.events().list(pageToken=page_token, **params))
+        changed += _apply_events(
+            db, state.user_id, response.get("items", []), response.get("timeZone") or DEFAULT_TIMEZONE
+        )
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    now = datetime.utcnow()
+    state.sync_token = response.get("nextSyncToken")
+    state.last_synced_at = now
+    if full:
+        state.last_full_sync_at = now
+    return changed
+
+
+def _get_state(db: Session, user_id: int) -> models.CalendarSyncState:
+    state = db.get(models.CalendarSyncState, user_id)
+    if state is None:
+        state = models.CalendarSyncState(user_id=user_id)
+        db.add(state)
+    return state
+
+
+def sync_user(user_id: int) -> int:
+    """
+    Pulls the host's calendar changes into busy_blocks, fully the first
+    time or after the sync token expired. Returns the number of changed events.
+    """
+    db = SessionLocal()
+    try:
+        user = db.get(models.User, user_id)
+        if user is None or not user.google_access_token:
+            return 0
+        client = get_google_client(user)
+        state = _get_state(db, user_id)
+        try:
+            changed = _pull(db, client, state, full=state.sync_token is None)
+        except Exception as e:
+            if _status_of(e) != 410:
+                raise
+            # Sync token expired: start over from a full listing.
+            db.rollback()
+            state = _get_state(db, user_id)
+            changed = _pull(db, client, state, full=True)
+        if changed:
+            state.busy_changed_at = datetime.utcnow()
+            crud.mark_host_slot_days_dirty(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+    if changed:
+        if busy_cache is not None:
+            busy_cache.invalidate_user(user_id)
+        slot_materializer.notify()
+    return changed
+
+
+# ---------- Push notifications ----------
+def ensure_watch(user_id: int) -> bool:
+    """
+    Makes sure the host has a live watch channel pointing at GOOGLE_WEBHOOK_URL,
+    renewing it when it expires within CALENDAR_WATCH_RENEW_MARGIN_SECONDS.
+    Returns True if a new channel was opened.
+    """
+    if not config.GOOGLE_WEBHOOK_URL:
+        return False
+    db = SessionLocal()
+    try:
+        user = db.get(models.User, user_id)
+        if user is None or not user.google_access_token:
+            return False
+        state = _get_state(db, user_id)
+        renew_at = datetime.utcnow() + timedelta(seconds=config.CALENDAR_WATCH_RENEW_MARGIN_SECONDS)
+        if state.channel_id and state.channel_expires_at and state.channel_expires_at > renew_at:
+            return False
+
+        client = get_google_client(user)
+        if state.channel_id:
+            try:
+                client.execute(client.service.channels().stop(
+                    body={"id": state.channel_id, "resourceId": state.channel_resource_id}
+                ))
+            except Exception as e:
+                print(f"Failed to stop calendar channel {state.channel_id}: {e}")
+
+        channel_id = uuid.uuid4().hex
+        channel_token = secrets.token_urlsafe(32)
+        with google_call("events.watch"):
+            response = client.execute(client.service.events().watch(calendarId="primary", body={
+                "id": channel_id,
+                "type": "web_hook",
+                "address": config.GOOGLE_WEBHOOK_URL,
+                "token": channel_token,
+            }))
+        state.channel_id = channel_id
+        state.channel_token = channel_token
+        state.channel_resource_id = response.get("resourceId")
+        expiration = response.get("expiration")
+        state.channel_expires_at = (
+            datetime.utcfromtimestamp(int(expiration) / 1000) if expiration else None
+        )
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def user_for_channel(db: Session, channel_id: str, channel_token: Optional[str]) -> Optional[int]:
+    """
+    Resolves a push notification to its host, checking the channel token.
+    """
+    state = db.query(models.CalendarSyncState).filter(
+        models.CalendarSyncState.channel_id == channel_id
+    ).first()
+    if state is None or not hmac.compare_digest(state.channel_token or "", channel_token or ""):
+        return None
+    return state.user_id
+
+
+def _connected_user_ids() -> list:
+    db = SessionLocal()
+    try:
+        return [uid for (uid,) in db.query(models.User.id).filter(models.User.google_access_token.isnot(None))]
+    finally:
+        db.close()
+
+
+def prune_past_blocks():
+    db = SessionLocal()
+    try:
+        db.execute(delete(models.BusyBlock).where(models.BusyBlock.end_utc < datetime.utcnow() - KEEP_PAST))
+        db.commit()
+    finally:
+        db.close()
+
+
+class CalendarSyncer:
+    """
+    Background thread that applies pushed changes as they arrive and polls
+    every connected host each interval (also opening/renewing watch channels).
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def mark_dirty(self, user_id: int):
+        with self._lock:
+            self._dirty.add(user_id)
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run_forever, name="calendar-syncer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def run_forever(self):
+        next_poll = 0.0
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self._lock:
+                user_ids, self._dirty = self._dirty, set()
+            polling = time.monotonic() >= next_poll
+            if polling:
+                next_poll = time.monotonic() + self.interval_seconds
+                try:
+                    user_ids |= set(_connected_user_ids())
+                    prune_past_blocks()
+                except Exception as e:
+                    print(f"Calendar syncer error: {e}")
+
+            for user_id in user_ids:
+                try:
+                    sync_user(user_id)
+                    if polling:
+                        ensure_watch(user_id)
+                except Exception as e:
+                    print(f"Calendar sync failed for user {user_id}: {e}")
+            self._wake.wait(max(0.0, next_poll - time.monotonic()))
+
+
+calendar_syncer = CalendarSyncer(config.CALENDAR_SYNC_INTERVAL_SECONDS)
@@ -0,0 +1,138 @@
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from .. import config, models
+from ..db import SessionLocal
+from .google_calendar import create_event_for_booking, invalidate_busy_intervals
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = config.CALENDAR_JOB_BACKOFF_BASE_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(seconds, config.CALENDAR_JOB_BACKOFF_MAX_SECONDS))
+
+
+def claim_due_jobs(db: Session, limit: int) -> List[int]:
+    """
+    Marks up to `limit` due jobs as running and returns their ids.
+    Each claim is a conditional UPDATE, so several workers can poll
+    the same table without picking up the same job twice.
+    """
+    now = datetime.utcnow()
+    lease_cutoff = now - timedelta(seconds=config.CALENDAR_JOB_LEASE_SECONDS)
+    candidates = db.query(models.CalendarJob.id).filter(
+        or_(
+            (models.CalendarJob.status == "pending") & (models.CalendarJob.next_attempt_at <= now),
+            (models.CalendarJob.status == "running") & (models.CalendarJob.updated_at <= lease_cutoff),
+        )
+    ).order_by(models.CalendarJob.next_attempt_at).limit(limit).all()
+
+    claimed = []
+    for (job_id,) in candidates:
+        result = db.execute(
+            update(models.CalendarJob)
+            .where(
+                models.CalendarJob.id == job_id,
+                or_(
+                    models.CalendarJob.status == "pending",
+                    (models.CalendarJob.status == "running") & (models.CalendarJob.updated_at <= lease_cutoff),
+                ),
+            )
+            .values(status="running", updated_at=now)
+        )
+        if result.rowcount == 1:
+            claimed.append(job_id)
+    db.commit()
+    return claimed
+
+
+def run_job(db: Session, job: models.CalendarJob):
+    booking = job.booking
+    event_type = booking.event_type
+    try:
+        if job.action != "create":
+            raise ValueError(f"Unknown calendar job action: {job.action}")
+        if not booking.gcal_event_id:
+            booking.gcal_event_id = create_event_for_booking(booking, event_type)
+        booking.status = "confirmed"
+        job.status = "done"
+        job.last_error = None
+        db.commit()
+        invalidate_busy_intervals(event_type.owner)
+    except Exception as e:
+        db.rollback()
+        job.attempts += 1
+        job.last_error = str(e)[:1000]
+        if job.attempts >= config.CALENDAR_JOB_MAX_ATTEMPTS:
+            job.status = "failed"
+            print(f"Calendar job {job.id} failed permanently: {e}")
+        else:
+            job.status = "pending"
+            job.next_attempt_at = datetime.utcnow() + _backoff(job.attempts)
+            print(f"Calendar job {job.id} failed (attempt {job.attempts}), retrying: {e}")
+        db.commit()
+
+
+def process_due_jobs(limit: Optional[int] = None) -> int:
+    """
+    Claims and runs one batch of due jobs. Returns how many were processed.
+    """
+    db = SessionLocal()
+    try:
+        job_ids = claim_due_jobs(db, limit or config.CALENDAR_WORKER_BATCH_SIZE)
+        for job_id in job_ids:
+            job = db.get(models.CalendarJob, job_id)
+            if job is not None:
+                run_job(db, job)
+        return len(job_ids)
+    finally:
+        db.close()
+
+
+class CalendarWorker:
+    """
+    Polls the calendar_jobs outbox. Runs as a background thread inside the
+    API process, or in the foreground via `python -m app.worker`.
+    """
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self):
+        """
+        Wakes the worker up right away, e.g. after a booking was committed.
+        """
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run_forever, name="calendar-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                processed = process_due_jobs()
+            except Exception as e:
+                print(f"Calendar worker error: {e}")
+                processed = 0
+            if processed == 0:
+                self._wake.wait(self.poll_seconds)
+
+
+calendar_worker = CalendarWorker(config.CALENDAR_WORKER_POLL_SECONDS)
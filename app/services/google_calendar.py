@@ -1,105 +1,124 @@
-import os
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from datetime import datetime
-import pytz
+from googleapiclient.errors import HttpError
+from .busy_cache import busy_cache
+from .google_clients import client_pool
+from .google_tokens import note_google_use
+from .intervals import normalize_busy, overlaps_any
+from .metrics import google_call
+from .singleflight import SingleFlight
+from .timezones import DEFAULT_TIMEZONE, event_type_timezone, to_epoch
 
-DEFAULT_TIMEZONE = "Asia/Almaty"
-SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+busy_flights = SingleFlight("freebusy")
 
-def get_google_service(user):
+def get_google_client(user):
     """
-    Reconstructs the Google Credentials object for the given user
-    and returns the Calendar Service.
+    Returns the pooled Calendar client for the given user,
+    building it only on first use or after the credentials changed.
     """
     if not user.google_access_token:
         raise Exception("User is not connected to Google Calendar")
 
-    creds = Credentials(
-        token=user.google_access_token,
-        refresh_token=user.google_refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=os.getenv("GOOGLE_CLIENT_ID"),
-        client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-        scopes=SCOPES
-    )
-    
-    return build('calendar', 'v3', credentials=creds)
+    return client_pool.get(user)
+
+def get_google_service(user):
+    """
+    Returns the Calendar Service for the given user.
+    """
+    return get_google_client(user).service
+
+def build_freebusy_body(start_dt: datetime, end_dt: datetime) -> dict:
+    return {
+        "timeMin": start_dt.isoformat(),
+        "timeMax": end_dt.isoformat(),
+        "timeZone": DEFAULT_TIMEZONE,
+        "items": [{"id": "primary"}]
+    }
+
+def parse_busy_intervals(events_result: dict) -> list:
+    calendars = events_result.get('calendars', {})
+    primary_cal = calendars.get('primary', {})
+    busy = primary_cal.get('busy', [])
+
+    cleaned_busy = []
+    for interval in busy:
+        cleaned_busy.append({
+            'start': datetime.fromisoformat(interval['start']),
+            'end': datetime.fromisoformat(interval['end'])
+        })
+    return cleaned_busy
+
+def _fetch_busy_intervals(user, start_dt: datetime, end_dt: datetime):
+    client = get_google_client(user)
+    body = build_freebusy_body(start_dt, end_dt)
+    with google_call("freebusy.query"):
+        events_result = client.execute(client.service.freebusy().query(body=body))
+    return parse_busy_intervals(events_result)
+
+def _load_busy_intervals(user, start_dt: datetime, end_dt: datetime):
+    busy = _fetch_busy_intervals(user, start_dt, end_dt)
+    if busy_cache is not None:
+        busy_cache.set(user.id, start_dt, end_dt, busy)
+    return busy
+
+def fetch_busy_intervals(user, start_dt: datetime, end_dt: datetime):
+    """
+    Like get_busy_intervals, but raises when Google can't be asked instead
+    of reporting the host as free. For results that get stored.
+    """
+    if busy_cache is not None:
+        cached = busy_cache.get(user.id, start_dt, end_dt)
+        if cached is not None:
+            return cached
+
+    key = (user.id, start_dt.isoformat(), end_dt.isoformat())
+    return busy_flights.do(key, _load_busy_intervals, user, start_dt, end_dt)
 
 def get_busy_intervals(user, start_dt: datetime, end_dt: datetime):
     """
     Fetches 'busy' periods from the user's primary calendar 
     between start_dt and end_dt.
+    Results are served from the busy cache when possible; failed
+    lookups are never cached. Concurrent misses for the same window
+    share one Google call.
     """
     try:
-        service = get_google_service(user)
-        
-        body = {
-            "timeMin": start_dt.isoformat(),
-            "timeMax": end_dt.isoformat(),
-            "timeZone": DEFAULT_TIMEZONE,
-            "items": [{"id": "primary"}]
-        }
-        
-        events_result = service.freebusy().query(body=body).execute()
-        calendars = events_result.get('calendars', {})
-        primary_cal = calendars.get('primary', {})
-        busy = primary_cal.get('busy', [])
-        
-        cleaned_busy = []
-        for interval in busy:
-            cleaned_busy.append({
-                'start': datetime.fromisoformat(interval['start']),
-                'end': datetime.fromisoformat(interval['end'])
-            })
-        return cleaned_busy
-
+        return fetch_busy_intervals(user, start_dt, end_dt)
     except Exception as e:
         print(f"Error fetching busy intervals: {e}")
         return []
 
-def is_overlapping(slot_start: datetime, slot_end: datetime, busy_times: list) -> bool:
+def invalidate_busy_intervals(user):
     """
-    Checks if a specific slot overlaps with any busy interval.
-    Robustly handles mixed naive/aware datetimes.
+    Drops every cached busy window for the given host.
     """
-    tz = pytz.timezone(DEFAULT_TIMEZONE)
-
-    if slot_start.tzinfo is None:
-        slot_start = tz.localize(slot_start)
-    if slot_end.tzinfo is None:
-        slot_end = tz.localize(slot_end)
-
-    for busy in busy_times:
-        b_start = busy['start']
-        b_end = busy['end']
-
-        if b_start.tzinfo is None:
-            b_start = tz.localize(b_start)
-        if b_end.tzinfo is None:
-            b_end = tz.localize(b_end)
-        
-        if slot_start < b_end and slot_end > b_start:
-            return True
-            
-    return False
+    if busy_cache is not None:
+        busy_cache.invalidate_user(user.id)
 
-def create_event_for_booking(booking, event_type):
-    print(booking)
-    host = event_type.owner 
-    
-    service = get_google_service(host)
+def is_overlapping(
+    slot_start: datetime, slot_end: datetime, busy_times: list, timezone: str = DEFAULT_TIMEZONE
+) -> bool:
+    """
+    Checks if a specific slot overlaps with any busy interval.
+    Handles mixed naive/aware datetimes; naive ones are wall-clock time in `timezone`.
+    For many slots, normalize once with intervals.normalize_busy and
+    use intervals.free_slot_indices instead.
+    """
+    merged = normalize_busy(busy_times, timezone)
+    return overlaps_any(to_epoch(slot_start, timezone), to_epoch(slot_end, timezone), merged)
 
-    event_body = {
+def build_event_body(booking, event_type) -> dict:
+    host = event_type.owner
+    timezone = event_type_timezone(event_type)
+    return {
         'summary': f"{event_type.name} with {booking.invitee_name}",
         'description': f"Notes: {booking.invitee_note}",
         'start': {
             'dateTime': booking.start_datetime.isoformat(),
-            'timeZone': DEFAULT_TIMEZONE,
+            'timeZone': timezone,
         },
         'end': {
             'dateTime': booking.end_datetime.isoformat(),
-            'timeZone': DEFAULT_TIMEZONE,
+            'timeZone': timezone,
         },
         'attendees': [
             {'email': booking.invitee_email},
@@ -113,12 +132,35 @@ def create_event_for_booking(booking, event_type):
         },
     }
 
-    event = service.events().insert(
-        calendarId='primary',
-        body=event_body,
-        conferenceDataVersion=1,
-        sendUpdates='all'
-    ).execute()
+def booking_event_id(booking) -> str:
+    """
+    The Google event id a booking is inserted with. Deterministic, so a
+    retried insert that Google already accepted comes back as 409 instead
+    of creating a second event. Event ids only allow the characters a-v and 0-9.
+    """
+    return f"booking{booking.id}"
+
+def create_event_for_booking(booking, event_type):
+    host = event_type.owner 
+    note_google_use(host)
+    
+    client = get_google_client(host)
+    event_body = build_event_body(booking, event_type)
+    event_body['id'] = booking_event_id(booking)
+
+    try:
+        with google_call("events.insert"):
+            event = client.execute(client.service.events().insert(
+                calendarId='primary',
+                body=event_body,
+                conferenceDataVersion=1,
+                sendUpdates='all'
+            ))
+    except HttpError as e:
+        if e.resp.status != 409:
+            raise
+        # An earlier attempt created the event but its response was lost
+        return event_body['id']
 
     return event.get('id')
     
\ No newline at end of file
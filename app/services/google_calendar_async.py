@@ -0,0 +1,148 @@
+"""
+Async counterpart of google_calendar.py built on a shared httpx.AsyncClient,
+so slot and booking routes don't hold a threadpool thread per Google round-trip.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from .. import config
+from .busy_cache import busy_cache
+from .google_calendar import booking_event_id, build_event_body, build_freebusy_body, parse_busy_intervals
+from .google_tokens import TOKEN_URI, expiry_from_seconds, google_use_due, note_google_use, persist_token
+from .metrics import google_call
+from .singleflight import AsyncSingleFlight
+
+CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+busy_flights = AsyncSingleFlight("freebusy")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide AsyncClient, so connections to Google are reused.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=config.GOOGLE_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=config.GOOGLE_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.GOOGLE_HTTP_MAX_KEEPALIVE,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _refresh_access_token(user) -> str:
+    response = await get_http_client().post(TOKEN_URI, data={
+        "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+        "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
+        "refresh_token": user.google_refresh_token,
+        "grant_type": "refresh_token",
+    })
+    response.raise_for_status()
+    tokens = response.json()
+    token = tokens["access_token"]
+    expiry = expiry_from_seconds(tokens.get("expires_in"))
+    await run_in_threadpool(persist_token, user.id, token, expiry, tokens.get("refresh_token"))
+    return token
+
+
+async def _access_token(user) -> str:
+    if not user.google_access_token:
+        raise Exception("User is not connected to Google Calendar")
+
+    expiry = user.google_token_expiry
+    if (
+        user.google_refresh_token
+        and expiry is not None
+        and expiry <= datetime.utcnow() + timedelta(seconds=60)
+    ):
+        # Normally the background refresher got here first.
+        return await _refresh_access_token(user)
+    return user.google_access_token
+
+
+async def _request(user, method: str, path: str, **kwargs) -> dict:
+    """
+    Calls the Calendar API as `user`, refreshing the token once on a 401.
+    """
+    client = get_http_client()
+    token = await _access_token(user)
+    response = await client.request(
+        method, CALENDAR_API + path, headers={"Authorization": f"Bearer {token}"}, **kwargs
+    )
+    if response.status_code == 401 and user.google_refresh_token:
+        token = await _refresh_access_token(user)
+        response = await client.request(
+            method, CALENDAR_API + path, headers={"Authorization": f"Bearer {token}"}, **kwargs
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _load_busy_intervals(user, start_dt: datetime, end_dt: datetime):
+    with google_call("freebusy.query"):
+        events_result = await _request(
+            user, "POST", "/freeBusy", json=build_freebusy_body(start_dt, end_dt)
+        )
+    busy = parse_busy_intervals(events_result)
+    if busy_cache is not None:
+        busy_cache.set(user.id, start_dt, end_dt, busy)
+    return busy
+
+
+async def get_busy_intervals(user, start_dt: datetime, end_dt: datetime):
+    """
+    Fetches 'busy' periods from the user's primary calendar
+    between start_dt and end_dt, sharing the busy cache with the sync client.
+    Concurrent misses for the same window share one request.
+    """
+    if google_use_due(user):
+        await run_in_threadpool(note_google_use, user)
+    if busy_cache is not None:
+        cached = busy_cache.get(user.id, start_dt, end_dt)
+        if cached is not None:
+            return cached
+
+    key = (user.id, start_dt.isoformat(), end_dt.isoformat())
+    try:
+        return await busy_flights.do(key, _load_busy_intervals, user, start_dt, end_dt)
+    except Exception as e:
+        print(f"Error fetching busy intervals: {e}")
+        return []
+
+
+async def create_event_for_booking(booking, event_type):
+    if google_use_due(event_type.owner):
+        await run_in_threadpool(note_google_use, event_type.owner)
+    event_body = build_event_body(booking, event_type)
+    event_body['id'] = booking_event_id(booking)
+    try:
+        with google_call("events.insert"):
+            event = await _request(
+                event_type.owner,
+                "POST",
+                "/calendars/primary/events",
+                params={"conferenceDataVersion": 1, "sendUpdates": "all"},
+                json=event_body,
+            )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 409:
+            raise
+        # An earlier attempt created the event but its response was lost
+        return event_body['id']
+    return event.get('id')
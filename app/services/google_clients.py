@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+
+from .. import config
+from .google_tokens import make_credentials, persist_credentials
+
+
+class PooledClient:
+    """
+    A built Calendar service plus its credentials.
+    httplib2 connections are not thread-safe, so every thread gets its own
+    authorized Http, which is then kept alive across requests.
+    """
+
+    def __init__(self, user):
+        self.user_id = user.id
+        self.creds = make_credentials(user)
+        self._local = threading.local()
+        self.service = build('calendar', 'v3', http=self.http(), cache_discovery=False)
+        self.last_used = time.monotonic()
+
+    def matches(self, user) -> bool:
+        """
+        True while the stored credentials are the ones this client holds
+        (including tokens this client refreshed and persisted itself).
+        """
+        return (
+            self.creds.token == user.google_access_token
+            and self.creds.refresh_token == user.google_refresh_token
+        )
+
+    def http(self) -> AuthorizedHttp:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(
+                self.creds, http=httplib2.Http(timeout=config.GOOGLE_HTTP_TIMEOUT_SECONDS)
+            )
+            self._local.http = http
+        return http
+
+    def execute(self, request):
+        """
+        Runs a googleapiclient request over this thread's connection.
+        If google-auth had to refresh the token on the way, the new
+        token is written back to the database.
+        """
+        self.last_used = time.monotonic()
+        token_before = self.creds.token
+        try:
+            return request.execute(http=self.http())
+        finally:
+            if self.creds.token != token_before:
+                try:
+                    persist_credentials(self.user_id, self.creds)
+                except Exception as e:
+                    print(f"Failed to persist refreshed Google token: {e}")
+
+
+class GoogleClientPool:
+    """
+    Per-user pool of Calendar clients, bounded in size (LRU) and with
+    idle eviction. A client is rebuilt only when the user's stored
+    credentials differ from the ones it was built with.
+    """
+
+    def __init__(self, max_size: int, idle_seconds: int):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._clients: "OrderedDict[int, PooledClient]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user) -> PooledClient:
+        with self._lock:
+            self._evict_idle()
+            client = self._clients.get(user.id)
+            if client is not None and client.matches(user):
+                self._clients.move_to_end(user.id)
+                client.last_used = time.monotonic()
+                return client
+
+        # Build outside the lock; discovery parsing is the slow part.
+        client = PooledClient(user)
+        with self._lock:
+            self._clients[user.id] = client
+            self._clients.move_to_end(user.id)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+    def update_credentials(self, user_id: int, creds):
+        """
+        Hands credentials refreshed elsewhere to the user's cached client, if
+        there is one, so it keeps matching the stored token. Never builds a client.
+        """
+        with self._lock:
+            client = self._clients.get(user_id)
+        if client is None:
+            return
+        if client.creds.refresh_token != creds.refresh_token:
+            self.discard(user_id)
+            return
+        # AuthorizedHttp holds client.creds itself, so update it in place
+        client.creds.token = creds.token
+        client.creds.expiry = creds.expiry
+
+    def discard(self, user_id: int):
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for user_id in [uid for uid, c in self._clients.items() if c.last_used < cutoff]:
+            del self._clients[user_id]
+
+
+client_pool = GoogleClientPool(config.GOOGLE_CLIENT_POOL_SIZE, config.GOOGLE_CLIENT_IDLE_SECONDS)
@@ -0,0 +1,189 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import Request
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .. import config, models
+from ..db import SessionLocal
+
+SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+# A host's last Google use is written at most this often
+ACTIVITY_WRITE_INTERVAL = timedelta(minutes=10)
+
+
+def expiry_from_seconds(expires_in: Optional[int]) -> Optional[datetime]:
+    """
+    Converts an OAuth 'expires_in' value into the naive UTC expiry google-auth uses.
+    """
+    if not expires_in:
+        return None
+    return datetime.utcnow() + timedelta(seconds=int(expires_in))
+
+
+def make_credentials(user) -> Credentials:
+    return Credentials(
+        token=user.google_access_token,
+        refresh_token=user.google_refresh_token,
+        expiry=user.google_token_expiry,
+        token_uri=TOKEN_URI,
+        client_id=os.getenv("GOOGLE_CLIENT_ID"),
+        client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+        scopes=SCOPES
+    )
+
+
+def persist_token(user_id: int, token: str, expiry: Optional[datetime], refresh_token: Optional[str] = None):
+    """
+    Writes a refreshed access token (and its expiry) back to the users table,
+    so the next request starts from a valid token.
+    """
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user is None:
+            return
+        user.google_access_token = token
+        user.google_token_expiry = expiry
+        if refresh_token:
+            user.google_refresh_token = refresh_token
+        user.google_refresh_failures = 0
+        user.google_refresh_retry_at = None
+        db.commit()
+    finally:
+        db.close()
+
+
+def persist_credentials(user_id: int, creds):
+    persist_token(user_id, creds.token, creds.expiry, creds.refresh_token)
+
+
+def google_use_due(user) -> bool:
+    last_used = user.google_last_used_at
+    return last_used is None or last_used <= datetime.utcnow() - ACTIVITY_WRITE_INTERVAL
+
+
+def note_google_use(user):
+    """
+    Records that the host's Google access was used for a request, so the
+    refresher keeps their token warm. Writes at most every ACTIVITY_WRITE_INTERVAL.
+    """
+    if not google_use_due(user):
+        return
+    now = datetime.utcnow()
+    # Keep the caller's object in step without dirtying its session
+    set_committed_value(user, "google_last_used_at", now)
+    db = SessionLocal()
+    try:
+        db.execute(update(models.User).where(models.User.id == user.id).values(google_last_used_at=now))
+        db.commit()
+    except Exception as e:
+        print(f"Failed to record Google use for user {user.id}: {e}")
+    finally:
+        db.close()
+
+
+def _backoff(failures: int) -> timedelta:
+    seconds = config.TOKEN_REFRESH_BACKOFF_BASE_SECONDS * (2 ** (failures - 1))
+    return timedelta(seconds=min(seconds, config.TOKEN_REFRESH_BACKOFF_MAX_SECONDS))
+
+
+def record_refresh_failure(user: models.User):
+    """
+    Counts a failed refresh and holds the host back from the refresher for a
+    growing delay. A revoked grant keeps failing until the host reconnects,
+    which resets the count.
+    """
+    failures = (user.google_refresh_failures or 0) + 1
+    db = SessionLocal()
+    try:
+        db.execute(update(models.User).where(models.User.id == user.id).values(
+            google_refresh_failures=failures,
+            google_refresh_retry_at=datetime.utcnow() + _backoff(failures),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def refresh_expiring_tokens() -> int:
+    """
+    Renews the tokens of recently active hosts that expire within the
+    configured margin (or whose expiry is unknown), skipping hosts that are
+    backing off after a failure. Other hosts refresh inline on their next
+    call. Returns the number of refreshed users.
+    """
+    from .google_clients import client_pool  # avoid circular imports
+
+    now = datetime.utcnow()
+    deadline = now + timedelta(seconds=config.TOKEN_REFRESH_MARGIN_SECONDS)
+    active_since = now - timedelta(seconds=config.TOKEN_REFRESH_ACTIVE_SECONDS)
+    db = SessionLocal()
+    try:
+        users = db.query(models.User).filter(
+            models.User.google_refresh_token.isnot(None),
+            (models.User.google_token_expiry.is_(None))
+            | (models.User.google_token_expiry <= deadline),
+            models.User.google_last_used_at >= active_since,
+            (models.User.google_refresh_retry_at.is_(None))
+            | (models.User.google_refresh_retry_at <= now),
+        ).all()
+    finally:
+        db.close()
+
+    refreshed = 0
+    for user in users:
+        # Standalone credentials: building a pooled client here would parse
+        # discovery per user and push hot clients out of the pool.
+        creds = make_credentials(user)
+        try:
+            creds.refresh(Request(httplib2.Http(timeout=config.GOOGLE_HTTP_TIMEOUT_SECONDS)))
+        except Exception as e:
+            print(f"Token refresh failed for user {user.id}: {e}")
+            record_refresh_failure(user)
+            continue
+        persist_credentials(user.id, creds)
+        client_pool.update_credentials(user.id, creds)
+        refreshed += 1
+    return refreshed
+
+
+class TokenRefresher:
+    """
+    Background thread that keeps Google access tokens fresh,
+    so request handlers never pay for an inline refresh.
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                refresh_expiring_tokens()
+            except Exception as e:
+                print(f"Token refresher error: {e}")
+            self._stop.wait(self.interval_seconds)
+
+
+token_refresher = TokenRefresher(config.TOKEN_REFRESH_INTERVAL_SECONDS)
@@ -0,0 +1,74 @@
+"""
+Interval helpers for free/busy computation.
+
+Intervals are (start, end) UTC epoch seconds. Busy intervals are
+normalized and merged once per request, then each candidate slot is
+checked with a binary search, instead of re-scanning and re-localizing
+every busy interval for every slot.
+"""
+from bisect import bisect_left
+from typing import Iterable, List, Sequence, Tuple
+
+from .timezones import to_epoch
+
+Interval = Tuple[int, int]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Sorts intervals and merges overlapping or touching ones.
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(i for i in intervals if i[0] <= i[1]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def normalize_busy(busy_times: Iterable[dict], timezone: str) -> List[Interval]:
+    """
+    Converts {'start', 'end'} dicts (naive or aware, mixed) into a sorted,
+    merged list of epoch intervals. Naive values are wall-clock time in `timezone`.
+    """
+    return merge_intervals(
+        (to_epoch(b['start'], timezone), to_epoch(b['end'], timezone)) for b in busy_times
+    )
+
+
+def overlaps_any(start: int, end: int, merged: Sequence[Interval]) -> bool:
+    """
+    Checks one interval against merged busy intervals with a binary search.
+    """
+    # Merged intervals are disjoint, so the only candidate is the last one starting before `end`.
+    idx = bisect_left(merged, (end,)) - 1
+    return idx >= 0 and merged[idx][1] > start
+
+
+def free_slot_indices(starts: Sequence[int], duration: int, merged: Sequence[Interval]) -> List[int]:
+    """
+    Indices of the slot starts whose [start, start + duration) doesn't overlap
+    any merged busy interval.
+    """
+    return [i for i, start in enumerate(starts) if not overlaps_any(start, start + duration, merged)]
+
+
+def free_intervals(window_start: int, window_end: int, merged: Sequence[Interval]) -> List[Interval]:
+    """
+    Returns the gaps between merged busy intervals inside [window_start, window_end).
+    """
+    gaps: List[Interval] = []
+    cursor = window_start
+    for start, end in merged:
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
@@ -0,0 +1,206 @@
+"""
+Metrics and tracing for the request hot path.
+
+    with stage("slots"):
+        ...
+
+adds the block's duration to the current request's stage timings (sent
+back in the Server-Timing header), to the kalendly_stage_seconds histogram
+and, with TRACING_ENABLED, wraps it in an OpenTelemetry span. SQL time is
+recorded as the "db" stage through SQLAlchemy cursor events, and Google
+API calls go through google_call(), which also tracks latency and errors.
+The busy cache's hit/miss/eviction counts are exported as counters.
+
+prometheus_client and opentelemetry are optional; without them the
+corresponding parts are no-ops.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .. import config
+from .busy_cache import busy_cache
+
+try:
+    import prometheus_client
+except ImportError:  # optional dependency
+    prometheus_client = None
+
+_tracer = None
+if config.TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("kalendly")
+    except ImportError:  # optional dependency
+        print("TRACING_ENABLED is set but opentelemetry is not installed")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class BusyCacheCollector:
+    """
+    Reads the busy cache's own hit/miss/eviction counts at scrape time.
+    """
+
+    def describe(self):
+        return self._families({"hits": 0, "misses": 0, "evictions": 0})
+
+    def collect(self):
+        if busy_cache is not None:
+            yield from self._families(busy_cache.stats())
+
+    @staticmethod
+    def _families(stats: dict):
+        from prometheus_client.core import CounterMetricFamily
+
+        return [
+            CounterMetricFamily(
+                f"kalendly_busy_cache_{name}", f"Google free/busy cache {name} in this process",
+                value=stats[name],
+            )
+            for name in ("hits", "misses", "evictions")
+        ]
+
+
+if prometheus_client is not None and config.METRICS_ENABLED:
+    HTTP_REQUEST_SECONDS = prometheus_client.Histogram(
+        "kalendly_http_request_seconds", "HTTP request latency",
+        ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+    )
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "kalendly_stage_seconds", "Time spent per request stage",
+        ["stage"], buckets=LATENCY_BUCKETS,
+    )
+    GOOGLE_REQUEST_SECONDS = prometheus_client.Histogram(
+        "kalendly_google_request_seconds", "Google Calendar API call latency",
+        ["operation"], buckets=LATENCY_BUCKETS,
+    )
+    GOOGLE_ERRORS = prometheus_client.Counter(
+        "kalendly_google_errors_total", "Failed Google Calendar API calls",
+        ["operation", "status"],
+    )
+    SINGLEFLIGHT_SHARED = prometheus_client.Counter(
+        "kalendly_singleflight_shared_total", "Calls served by an identical in-flight call",
+        ["flight"],
+    )
+
+    prometheus_client.REGISTRY.register(BusyCacheCollector())
+else:
+    HTTP_REQUEST_SECONDS = STAGE_SECONDS = GOOGLE_REQUEST_SECONDS = GOOGLE_ERRORS = None
+    SINGLEFLIGHT_SHARED = None
+
+
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def _record(name: str, seconds: float):
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+    if STAGE_SECONDS is not None:
+        STAGE_SECONDS.labels(name).observe(seconds)
+
+
+@contextmanager
+def stage(name: str):
+    span = _tracer.start_as_current_span(name) if _tracer is not None else nullcontext()
+    started = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            _record(name, time.perf_counter() - started)
+
+
+@contextmanager
+def collect_stage_timings():
+    """
+    Collects stage timings for everything run in this context, including
+    threadpool work and tasks started from it (they share the dict).
+    """
+    timings: Dict[str, float] = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    if HTTP_REQUEST_SECONDS is not None:
+        HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def record_shared_flight(flight: str):
+    if SINGLEFLIGHT_SHARED is not None:
+        SINGLEFLIGHT_SHARED.labels(flight).inc()
+
+
+def _error_status(exc: BaseException) -> str:
+    # googleapiclient HttpError has .resp.status, httpx errors have .response.status_code
+    resp = getattr(exc, "resp", None)
+    if getattr(resp, "status", None) is not None:
+        return str(resp.status)
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) is not None:
+        return str(response.status_code)
+    return type(exc).__name__
+
+
+@contextmanager
+def google_call(operation: str):
+    """
+    Times one Google Calendar API call as the "google" stage and records
+    its latency, plus an error count labelled with the HTTP status on failure.
+    """
+    started = time.perf_counter()
+    try:
+        with stage("google"):
+            yield
+    except Exception as e:
+        if GOOGLE_ERRORS is not None:
+            GOOGLE_ERRORS.labels(operation, _error_status(e)).inc()
+        raise
+    finally:
+        if GOOGLE_REQUEST_SECONDS is not None:
+            GOOGLE_REQUEST_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if started:
+        _record("db", time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _drop_query_timer(context):
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def metrics_payload():
+    """
+    (body, content type) for the /metrics endpoint, or None without prometheus_client.
+    """
+    if prometheus_client is None or not config.METRICS_ENABLED:
+        return None
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,153 @@
+"""
+Compiled availability schedules.
+
+An event type's weekly rules are turned once into per-weekday arrays of
+slot start offsets (minutes from local midnight). Slot generation then
+only adds offsets to a day's midnight epoch. Compiled schedules are cached per event type
+and keyed by EventType.version, which is bumped on every change to the
+rules, duration or buffer.
+"""
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from .timezones import wall_epochs
+
+
+def parse_minutes(value: str) -> int:
+    """
+    "HH:MM" -> minutes from midnight ("24:00" is allowed as end of day).
+    """
+    h, m = map(int, value.split(":"))
+    return h * 60 + m
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_rules(rules: Iterable) -> List[Tuple[int, str, str]]:
+    """
+    Validates rules (objects with weekday/start_time/end_time) and merges
+    overlapping ranges on the same weekday. Touching ranges stay separate:
+    slots start from each range's own start time. Returns sorted
+    (weekday, "HH:MM", "HH:MM") tuples. Raises ValueError on bad input.
+    """
+    per_day = [[] for _ in range(7)]
+    for r in rules:
+        if not 0 <= r.weekday <= 6:
+            raise ValueError(f"weekday must be 0-6, got {r.weekday}")
+        try:
+            start = parse_minutes(r.start_time)
+            end = parse_minutes(r.end_time)
+        except ValueError:
+            raise ValueError(f"times must be HH:MM, got {r.start_time!r}-{r.end_time!r}")
+        if not (0 <= start < end <= 24 * 60):
+            raise ValueError(f"invalid time range {r.start_time}-{r.end_time}")
+        per_day[r.weekday].append((start, end))
+
+    normalized = []
+    for weekday, ranges in enumerate(per_day):
+        merged: List[List[int]] = []
+        for start, end in sorted(ranges):
+            if merged and start < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        normalized.extend((weekday, format_minutes(s), format_minutes(e)) for s, e in merged)
+    return normalized
+
+
+class CompiledSchedule:
+    __slots__ = ("event_type_id", "version", "duration_minutes", "offsets")
+
+    def __init__(self, event_type_id: int, version: int, duration_minutes: int, offsets: List[array]):
+        self.event_type_id = event_type_id
+        self.version = version
+        self.duration_minutes = duration_minutes
+        self.offsets = offsets  # offsets[weekday] -> sorted array of slot starts
+
+    def has_slots_on(self, day: date) -> bool:
+        return len(self.offsets[day.weekday()]) > 0
+
+    def slot_starts(self, day: date) -> array:
+        return self.offsets[day.weekday()]
+
+    @property
+    def duration_seconds(self) -> int:
+        return self.duration_minutes * 60
+
+    def slot_epochs(self, day: date, timezone: str) -> List[int]:
+        """
+        Slot starts on `day` as epoch seconds, reading the rules as wall-clock time in `timezone`.
+        """
+        return wall_epochs(day, self.offsets[day.weekday()], timezone)
+
+
+def compile_schedule(
+    event_type_id: int,
+    version: int,
+    duration_minutes: int,
+    buffer_minutes: int,
+    rules: Iterable[Tuple[int, str, str]],
+) -> CompiledSchedule:
+    """
+    Builds the per-weekday offsets from (weekday, start_time, end_time) rules.
+    Slots inside a rule are spaced by duration + buffer, as before.
+    """
+    per_day = [set() for _ in range(7)]
+    step = duration_minutes + (buffer_minutes or 0)
+    for weekday, start_time, end_time in rules:
+        current = parse_minutes(start_time)
+        end = parse_minutes(end_time)
+        while duration_minutes > 0 and current + duration_minutes <= end:
+            per_day[weekday].add(current)
+            current += step
+    offsets = [array("H", sorted(day)) for day in per_day]
+    return CompiledSchedule(event_type_id, version, duration_minutes, offsets)
+
+
+class ScheduleCache:
+    """
+    LRU of compiled schedules, keyed by event type id and validated by version.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CompiledSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, event_type) -> CompiledSchedule:
+        with self._lock:
+            compiled = self._entries.get(event_type.id)
+            if compiled is not None and compiled.version == event_type.version:
+                self._entries.move_to_end(event_type.id)
+                return compiled
+
+        # Only a miss touches availability_rules (and possibly lazy-loads them).
+        compiled = compile_schedule(
+            event_type.id,
+            event_type.version,
+            event_type.duration_minutes,
+            event_type.buffer_minutes,
+            [(r.weekday, r.start_time, r.end_time) for r in event_type.availability_rules],
+        )
+        with self._lock:
+            self._entries[event_type.id] = compiled
+            self._entries.move_to_end(event_type.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, event_type_id: Optional[int]):
+        with self._lock:
+            self._entries.pop(event_type_id, None)
+
+
+schedule_cache = ScheduleCache()
+
+
+def get_schedule(event_type) -> CompiledSchedule:
+    return schedule_cache.get(event_type)
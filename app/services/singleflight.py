@@ -0,0 +1,110 @@
+"""
+Request coalescing: concurrent calls with the same key share one execution.
+
+    flights = SingleFlight("freebusy")
+    busy = flights.do((user.id, start, end), fetch, user, start, end)
+
+The first caller runs fn; callers arriving while it is in flight wait for
+it and get the same result (or exception). Nothing is kept afterwards, so
+this complements caches rather than replacing them. AsyncSingleFlight is
+the asyncio counterpart; its work runs as a task, so a caller that goes
+away doesn't cancel it for the others.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .. import config
+from .metrics import record_shared_flight
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Thread-based variant for sync code (threadpool routes, background workers).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        if not config.SINGLEFLIGHT_ENABLED:
+            return fn(*args)
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            record_shared_flight(self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    asyncio variant: callers await the same task.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        if not config.SINGLEFLIGHT_ENABLED:
+            return await fn(*args)
+
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.calls += 1
+        else:
+            self.shared += 1
+            record_shared_flight(self.name)
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller went away
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._tasks)}
@@ -0,0 +1,179 @@
+"""
+Array-based slot engine.
+
+The candidate starts of a whole window are built as one array of epoch
+seconds (each day's midnight plus its compiled offsets), busy intervals
+are masked out in bulk with one binary search per slot, and the result is
+written straight to JSON text. No TimeSlot model is built per slot, which
+matters for long ranges with short durations (tens of thousands of
+candidates per response).
+
+NumPy is used when it is installed and SLOT_ENGINE_NUMPY is on; otherwise
+the same steps run on plain lists with bisect.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Sequence
+
+from .. import config
+from .intervals import Interval, free_slot_indices
+from .timezones import day_info, get_zone, wall_epochs
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# "HH:MM:00" for every minute of the day
+_CLOCK = [f"{h:02d}:{m:02d}:00" for h in range(24) for m in range(60)]
+
+
+def numpy_enabled() -> bool:
+    return np is not None and config.SLOT_ENGINE_NUMPY
+
+
+def _is_array(values) -> bool:
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def candidate_starts(schedule, days: Sequence[date], timezone: str):
+    """
+    Slot starts of the ascending `days` as one sorted sequence of epoch seconds.
+    """
+    if not numpy_enabled():
+        return [ts for d in days for ts in schedule.slot_epochs(d, timezone)]
+    parts = []
+    for d in days:
+        offsets = schedule.slot_starts(d)
+        if not len(offsets):
+            continue
+        midnight, uniform = day_info(d, timezone)
+        if uniform:
+            parts.append(np.frombuffer(offsets, dtype=np.uint16).astype(np.int64) * 60 + midnight)
+        else:
+            parts.append(np.array(wall_epochs(d, offsets, timezone), dtype=np.int64))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def free_starts(starts, duration: int, busy: Sequence[Interval]):
+    """
+    The starts whose [start, start + duration) misses every merged busy interval.
+    """
+    if not _is_array(starts):
+        return [starts[i] for i in free_slot_indices(starts, duration, busy)]
+    if not busy or not len(starts):
+        return starts
+    intervals = np.asarray(busy, dtype=np.int64)
+    # Merged intervals are disjoint, so only the last one starting before the slot's end can overlap it.
+    idx = np.searchsorted(intervals[:, 0], starts + duration, side="left") - 1
+    free = (idx < 0) | (intervals[np.maximum(idx, 0), 1] <= starts)
+    return starts[free]
+
+
+def drop_repeated_times(starts, duration: int, days: Sequence[date], timezone: str):
+    """
+    Leaves out slots that start or end in the hour repeated when clocks go
+    back. As naive wall-clock times they are ambiguous: the end could read
+    before the start, and a booking made from them would be read as the
+    first occurrence. Only days with a DST change (and their neighbours'
+    slots running into them) are checked.
+    """
+    if not len(starts) or not days:
+        return starts
+    changes = [d for d in list(days) + [days[-1] + timedelta(days=1)] if not day_info(d, timezone)[1]]
+    if not changes:
+        return starts
+    zone = get_zone(timezone)
+    is_array = _is_array(starts)
+    dropped = []
+    for d in changes:
+        lo, hi = day_info(d, timezone)[0] - duration, day_info(d + timedelta(days=1), timezone)[0]
+        if is_array:
+            first, last = np.searchsorted(starts, [lo, hi], side="left").tolist()
+        else:
+            first, last = bisect_left(starts, lo), bisect_left(starts, hi)
+        for i in range(first, last):
+            ts = int(starts[i])
+            if datetime.fromtimestamp(ts, zone).fold or datetime.fromtimestamp(ts + duration, zone).fold:
+                dropped.append(i)
+    if not dropped:
+        return starts
+    if is_array:
+        return np.delete(starts, dropped)
+    dropped = set(dropped)
+    return [ts for i, ts in enumerate(starts) if i not in dropped]
+
+
+def split_days(starts, bounds: Sequence[int]) -> list:
+    """
+    Splits sorted starts by day: day i gets bounds[i] <= start < bounds[i + 1].
+    """
+    if _is_array(starts):
+        cuts = np.searchsorted(starts, bounds, side="left").tolist()
+    else:
+        cuts = [bisect_left(starts, b) for b in bounds]
+    return [starts[cuts[i]:cuts[i + 1]] for i in range(len(bounds) - 1)]
+
+
+def _iso(ts: int, zone, aware: bool) -> str:
+    # Same text pydantic produces for a datetime
+    dt = datetime.fromtimestamp(ts, zone)
+    if not aware:
+        return dt.replace(tzinfo=None).isoformat()
+    text = dt.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _slot_json(start: str, end: str) -> str:
+    return f'{{"start":"{start}","end":"{end}"}}'
+
+
+def render_day(day: date, starts, duration: int, timezone: str, aware: bool) -> str:
+    """
+    JSON array of {"start", "end"} for one day's starts, as times in
+    `timezone`: with the UTC offset when `aware`, naive otherwise.
+    """
+    if not len(starts):
+        return "[]"
+    zone = get_zone(timezone)
+    midnight, uniform = day_info(day, timezone)
+    if not (uniform and duration % 60 == 0 and midnight % 60 == 0):
+        return "[" + ",".join(_slot_json(_iso(ts, zone, aware), _iso(ts + duration, zone, aware)) for ts in starts) + "]"
+
+    # The whole day has one UTC offset: format from minutes of the day
+    suffix = _iso(midnight, zone, aware)[19:]
+    prefix = day.isoformat() + "T"
+    duration_minutes = duration // 60
+    minutes = ((starts - midnight) // 60).tolist() if _is_array(starts) else [(ts - midnight) // 60 for ts in starts]
+    parts = []
+    for m in minutes:
+        end = m + duration_minutes
+        end_text = (
+            prefix + _CLOCK[end] + suffix if end < 1440
+            else _iso(midnight + end * 60, zone, aware)  # ends on a later day
+        )
+        parts.append(_slot_json(prefix + _CLOCK[m] + suffix, end_text))
+    return "[" + ",".join(parts) + "]"
+
+
+def render_wall_day(day: date, offsets: Sequence[int], duration_minutes: int) -> str:
+    """
+    JSON array of naive {"start", "end"} for stored wall-clock offsets (minutes from midnight).
+    """
+    prefix = day.isoformat() + "T"
+    midnight = datetime.combine(day, time.min)
+    parts = []
+    for m in offsets:
+        end = m + duration_minutes
+        end_text = prefix + _CLOCK[end] if end < 1440 else (midnight + timedelta(minutes=end)).isoformat()
+        parts.append(_slot_json(prefix + _CLOCK[m], end_text))
+    return "[" + ",".join(parts) + "]"
+
+
+def days_json(days: Sequence[date], rendered: Sequence[str]) -> str:
+    """
+    JSON array of {"date", "slots"} from per-day rendered slot arrays.
+    """
+    return "[" + ",".join(
+        f'{{"date":"{d.isoformat()}","slots":{slots}}}' for d, slots in zip(days, rendered)
+    ) + "]"
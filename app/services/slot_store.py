@@ -0,0 +1,238 @@
+"""
+Materialized free slots.
+
+Free slots of every active event type are precomputed per day over a
+rolling SLOT_HORIZON_DAYS window and stored in slot_days, so a public
+slot read is one primary-key range lookup instead of a schedule + busy
+computation per visitor.
+
+A stored day is served only while it is still valid:
+- booking writes mark the days they cover dirty (in the same transaction),
+- Google busy changes from the mirror sync mark all the host's days dirty,
+- rule/duration/buffer changes bump EventType.version, which the row must match,
+- and rows older than SLOT_MAX_AGE_SECONDS are recomputed anyway.
+Anything else falls back to live computation. The SlotMaterializer thread
+recomputes invalid days in the background.
+"""
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, insert, or_, update
+from sqlalchemy.orm import Session
+
+from .. import config, crud, models
+from ..db import SessionLocal
+from .google_calendar import fetch_busy_intervals
+from .intervals import Interval, normalize_busy
+from .schedule import get_schedule
+from .slot_engine import candidate_starts, drop_repeated_times, free_starts, render_wall_day, split_days
+from .timezones import event_type_timezone, get_zone, midnight_epoch, to_utc, utc_datetime, wall_minutes
+
+
+def encode_slots(offsets) -> str:
+    """
+    Stores free slots as their start offsets in minutes from local midnight.
+    """
+    return ",".join(map(str, offsets))
+
+
+def render_stored(row: models.SlotDay) -> str:
+    """
+    The stored day as a JSON array of naive slots, ready to send.
+    """
+    offsets = [int(m) for m in row.slots.split(",")] if row.slots else []
+    return render_wall_day(row.day, offsets, row.duration_minutes)
+
+
+def is_servable(row: models.SlotDay, current_version: int, now: Optional[datetime] = None) -> bool:
+    now = now or datetime.utcnow()
+    return (
+        not row.is_dirty
+        and row.version == current_version
+        and row.computed_at is not None
+        and row.computed_at >= now - timedelta(seconds=config.SLOT_MAX_AGE_SECONDS)
+    )
+
+
+def servable_days(rows, first_day: date, last_day: date) -> Optional[Dict[date, str]]:
+    """
+    Renders (SlotDay, current_version) rows if every day of [first_day, last_day]
+    is present and servable; None otherwise (the caller computes live).
+    """
+    now = datetime.utcnow()
+    if len(rows) != (last_day - first_day).days + 1:
+        return None
+    if not all(is_servable(row, version, now) for row, version in rows):
+        return None
+    return {row.day: render_stored(row) for row, _ in rows}
+
+
+def _busy_for_window(db: Session, et: models.EventType, timezone: str, first_day: date, last_day: date) -> List[Interval]:
+    window_start = midnight_epoch(first_day, timezone)
+    window_end = midnight_epoch(last_day + timedelta(days=1), timezone)
+
+    google_busy = None
+    if config.BUSY_SOURCE == "mirror":
+        blocks = crud.get_busy_blocks(
+            db, et.user_id,
+            utc_datetime(window_start).replace(tzinfo=None),
+            utc_datetime(window_end).replace(tzinfo=None),
+        )
+        if blocks is not None:
+            google_busy = [{'start': to_utc(s), 'end': to_utc(e)} for s, e in blocks]
+    if google_busy is None:
+        # Raises if Google is unreachable: an empty answer would be stored as a free day
+        google_busy = fetch_busy_intervals(et.owner, utc_datetime(window_start), utc_datetime(window_end))
+    # Bookings are naive wall-clock time in the event type's zone
+    local_busy = [
+        {'start': s, 'end': e}
+        for s, e in crud.get_active_booking_intervals(
+            db, et.id, datetime.combine(first_day, time.min), datetime.combine(last_day + timedelta(days=1), time.min)
+        )
+    ]
+    return normalize_busy(google_busy + local_busy, timezone)
+
+def refresh_days(db: Session, et: models.EventType, days: List[date]) -> int:
+    """
+    Recomputes and stores the given days of one event type. A day that was
+    marked dirty again while computing stays dirty for the next round.
+    If the host's busy times can't be read, raises and stores nothing.
+    """
+    if not days:
+        return 0
+    days = sorted(days)
+    # Every day needs a row before reading, so concurrent booking writes can mark it.
+    existing = {
+        d for (d,) in db.query(models.SlotDay.day).filter(
+            models.SlotDay.event_type_id == et.id,
+            models.SlotDay.day.in_(days),
+        )
+    }
+    missing = [d for d in days if d not in existing]
+    if missing:
+        db.execute(insert(models.SlotDay), [
+            {"event_type_id": et.id, "day": d, "version": et.version,
+             "duration_minutes": et.duration_minutes, "slots": "", "is_dirty": True}
+            for d in missing
+        ])
+        db.commit()
+
+    started = datetime.utcnow()
+    schedule = get_schedule(et)
+    timezone = event_type_timezone(et)
+    has_slots = any(schedule.has_slots_on(d) for d in days)
+    busy = _busy_for_window(db, et, timezone, days[0], days[-1]) if has_slots else []
+
+    free = free_starts(candidate_starts(schedule, days, timezone), schedule.duration_seconds, busy)
+    # Stored days are served as naive wall-clock times
+    free = drop_repeated_times(free, schedule.duration_seconds, days, timezone)
+    # Days may be non-contiguous, so split at each day's own bounds
+    bounds = [b for d in days for b in (midnight_epoch(d, timezone), midnight_epoch(d + timedelta(days=1), timezone))]
+    per_day = split_days(free, bounds)[::2]
+
+    for d, day_free in zip(days, per_day):
+        db.execute(
+            update(models.SlotDay)
+            .where(
+                models.SlotDay.event_type_id == et.id,
+                models.SlotDay.day == d,
+                or_(models.SlotDay.dirtied_at.is_(None), models.SlotDay.dirtied_at <= started),
+            )
+            .values(
+                version=schedule.version,
+                duration_minutes=schedule.duration_minutes,
+                slots=encode_slots(wall_minutes(int(ts), d, timezone) for ts in day_free),
+                is_dirty=False,
+                computed_at=started,
+            )
+        )
+    db.commit()
+    return len(days)
+
+
+def refresh_horizon() -> int:
+    """
+    Brings every active event type's next SLOT_HORIZON_DAYS days (from today
+    in its own zone) up to date and drops past days. Returns the number of
+    recomputed days.
+    """
+    now = datetime.now(get_zone("UTC"))
+    # No zone is more than a day behind UTC
+    oldest_today = now.date() - timedelta(days=1)
+    stale_before = datetime.utcnow() - timedelta(seconds=config.SLOT_MAX_AGE_SECONDS)
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(models.SlotDay).where(models.SlotDay.day < oldest_today))
+        db.commit()
+
+        valid = {}
+        for et_id, d in db.query(models.SlotDay.event_type_id, models.SlotDay.day).join(
+            models.EventType, models.EventType.id == models.SlotDay.event_type_id
+        ).filter(
+            models.SlotDay.day >= oldest_today,
+            models.SlotDay.is_dirty.is_(False),
+            models.SlotDay.version == models.EventType.version,
+            and_(models.SlotDay.computed_at.isnot(None), models.SlotDay.computed_at >= stale_before),
+        ):
+            valid.setdefault(et_id, set()).add(d)
+
+        refreshed = 0
+        event_types = db.query(models.EventType).options(*crud.WITH_OWNER).filter(
+            models.EventType.is_active.is_(True)
+        ).all()
+        for et in event_types:
+            try:
+                today = now.astimezone(get_zone(event_type_timezone(et))).date()
+                horizon = (today + timedelta(days=i) for i in range(config.SLOT_HORIZON_DAYS))
+                days = [d for d in horizon if d not in valid.get(et.id, ())]
+                refreshed += refresh_days(db, et, days)
+            except Exception as e:
+                db.rollback()
+                print(f"Slot refresh failed for event type {et.id}: {e}")
+        return refreshed
+    finally:
+        db.close()
+
+
+class SlotMaterializer:
+    """
+    Background thread that keeps slot_days filled and valid. Wakes up early
+    when notified about a change, e.g. right after a booking.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self):
+        if self._thread is not None:
+            self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run_forever, name="slot-materializer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                refresh_horizon()
+            except Exception as e:
+                print(f"Slot materializer error: {e}")
+            self._wake.wait(self.interval_seconds)
+
+
+slot_materializer = SlotMaterializer(config.SLOT_REFRESH_INTERVAL_SECONDS)
@@ -0,0 +1,142 @@
+"""
+Time zone handling for the slot engine.
+
+Slots are computed as UTC epoch seconds; zones only come in at the edges:
+turning a day's wall-clock rule offsets into epochs, reading stored
+bookings (naive wall-clock time in the event type's zone) and rendering
+results in the invitee's zone. Zone objects and per-day conversions are
+cached, so the hot path doesn't look anything up per slot.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .. import config
+
+DEFAULT_TIMEZONE = config.DEFAULT_TIMEZONE
+
+_SECOND = timedelta(seconds=1)
+
+
+@lru_cache(maxsize=None)  # bounded by the tz database; unknown names raise and aren't cached
+def get_zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError(f"Unknown time zone {name!r}")
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        get_zone(name)
+        return True
+    except (ValueError, TypeError):
+        # TypeError: a non-string name from an untyped JSON body; lists and
+        # dicts fail in the lru_cache key before get_zone runs
+        return False
+
+
+def event_type_timezone(event_type) -> str:
+    """
+    Zone of the event type's rules and bookings: its own, else the host's,
+    else DEFAULT_TIMEZONE. Expects the owner to be loaded.
+    """
+    owner = event_type.owner
+    return event_type.timezone or (owner.timezone if owner is not None else None) or DEFAULT_TIMEZONE
+
+
+@lru_cache(maxsize=16384)
+def day_info(day: date, name: str) -> Tuple[int, bool]:
+    """
+    (epoch of local midnight, whether the UTC offset is the same all day).
+    """
+    zone = get_zone(name)
+    midnight = datetime.combine(day, time.min, zone)
+    next_midnight = datetime.combine(day + timedelta(days=1), time.min, zone)
+    return int(midnight.timestamp()), midnight.utcoffset() == next_midnight.utcoffset()
+
+
+def midnight_epoch(day: date, name: str) -> int:
+    return day_info(day, name)[0]
+
+
+def wall_epochs(day: date, offsets: Sequence[int], name: str) -> List[int]:
+    """
+    Epochs of wall-clock times `offsets` (minutes from midnight) on `day`.
+    Only days with a DST change need a per-offset conversion; times that
+    don't exist locally (skipped by a spring-forward) are left out.
+    """
+    midnight, uniform = day_info(day, name)
+    if uniform:
+        return [midnight + 60 * m for m in offsets]
+    zone = get_zone(name)
+    base = datetime.combine(day, time.min)
+    epochs = []
+    for m in offsets:
+        wall = base + timedelta(minutes=m)
+        ts = int(wall.replace(tzinfo=zone).timestamp())
+        if datetime.fromtimestamp(ts, zone).replace(tzinfo=None) == wall:
+            epochs.append(ts)
+    return epochs
+
+
+def wall_minutes(ts: int, day: date, name: str) -> int:
+    """
+    Inverse of wall_epochs: minutes from local midnight of `day` on the wall clock.
+    """
+    midnight, uniform = day_info(day, name)
+    if uniform:
+        return (ts - midnight) // 60
+    return (from_epoch(ts, name).replace(tzinfo=None) - datetime.combine(day, time.min)) // timedelta(minutes=1)
+
+
+def to_epoch(dt: datetime, name: str) -> int:
+    """
+    Epoch seconds of `dt`; naive values are wall-clock time in `name`.
+    """
+    if dt.tzinfo is None:
+        day = dt.date()
+        midnight, uniform = day_info(day, name)
+        if uniform:
+            return midnight + (dt - datetime.combine(day, time.min)) // _SECOND
+        dt = dt.replace(tzinfo=get_zone(name))
+    return int(dt.timestamp())
+
+
+def from_epoch(ts: int, name: str) -> datetime:
+    return datetime.fromtimestamp(ts, get_zone(name))
+
+
+def utc_datetime(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+def to_utc(dt: datetime) -> datetime:
+    """
+    Marks a naive UTC datetime (as stored in busy_blocks) as UTC.
+    """
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def to_wall_clock(dt: datetime, name: str) -> datetime:
+    """
+    Naive wall-clock time in `name`, the way bookings are stored. Naive input is kept as is.
+    """
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(get_zone(name)).replace(tzinfo=None)
+
+
+def convert_wall_clock(dt: datetime, from_name: str, to_name: str) -> datetime:
+    """
+    Naive wall-clock time `dt` in `from_name`, as naive wall-clock time in `to_name`.
+    """
+    return to_wall_clock(dt.replace(tzinfo=get_zone(from_name)), to_name)
+
+
+def local_days(start_ts: int, end_ts: int, name: str) -> Tuple[date, date]:
+    """
+    First and last local date touched by [start_ts, end_ts).
+    """
+    return from_epoch(start_ts, name).date(), from_epoch(end_ts - 1, name).date()
@@ -0,0 +1,36 @@
+"""
+Standalone calendar outbox worker.
+
+    python -m app.worker
+
+Set CALENDAR_WORKER_INPROCESS=false on the API service when running this.
+With CALENDAR_SYNC_ENABLED the Google busy mirror is kept up to date here too
+(then disable it on the API service). With SLOT_MATERIALIZATION_ENABLED the
+slot_days refresher runs here as well; set SLOT_MATERIALIZER_INPROCESS=false on the API.
+"""
+from .db import Base, engine
+from .migrations import run_migrations
+from . import config
+from .services.calendar_sync import calendar_syncer
+from .services.calendar_worker import calendar_worker
+from .services.slot_store import slot_materializer
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    if config.CALENDAR_SYNC_ENABLED:
+        calendar_syncer.start()
+    if config.SLOT_MATERIALIZATION_ENABLED:
+        slot_materializer.start()
+    print("Calendar worker started")
+    try:
+        calendar_worker.run_forever()
+    except KeyboardInterrupt:
+        slot_materializer.stop()
+        calendar_syncer.stop()
+        print("Calendar worker stopped")
+
+
+if __name__ == "__main__":
+    main()
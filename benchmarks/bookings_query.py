@@ -0,0 +1,116 @@
+"""
+Bookings lookup benchmark.
+
+Seeds a large bookings table, then times the slot-lookup query
+(crud.get_active_booking_intervals) for random days and prints its plan.
+
+    python -m benchmarks.bookings_query --url sqlite:///./bench.db --rows 300000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.db import Base, make_engine
+from app.migrations import run_migrations
+
+FIRST_DAY = datetime(2024, 1, 1)
+
+
+def seed(Session, rows: int, event_types: int, days: int):
+    db = Session()
+    user = models.User(email=f"bench-{time.time_ns()}@example.com")
+    db.add(user)
+    db.flush()
+    et_ids = []
+    for i in range(event_types):
+        et = models.EventType(name=f"Bench {i}", slug=f"bench-{user.id}-{i}", duration_minutes=30, user_id=user.id)
+        db.add(et)
+        db.flush()
+        et_ids.append(et.id)
+    db.commit()
+
+    batch = []
+    statuses = ["confirmed"] * 8 + ["pending", "cancelled"]
+    for n in range(rows):
+        start = FIRST_DAY + timedelta(days=random.randrange(days), minutes=15 * random.randrange(96))
+        batch.append({
+            "event_type_id": random.choice(et_ids),
+            "start_datetime": start,
+            "end_datetime": start + timedelta(minutes=random.choice([15, 30, 60, 90])),
+            "invitee_name": "Bench",
+            "invitee_email": f"bench{n}@example.com",
+            "status": random.choice(statuses),
+        })
+        if len(batch) == 10000:
+            db.execute(insert(models.Booking), batch)
+            db.commit()
+            batch = []
+    if batch:
+        db.execute(insert(models.Booking), batch)
+        db.commit()
+    db.close()
+    return et_ids
+
+
+def explain(engine, et_id: int, start: datetime, end: datetime):
+    db = sessionmaker(bind=engine)()
+    stmt = db.query(models.Booking.start_datetime, models.Booking.end_datetime).filter(
+        *crud._active_overlapping(et_id, start, end)
+    ).statement
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        for row in conn.execute(text(prefix + str(compiled))):
+            print("  ", " ".join(str(c) for c in row))
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite:///./bench.db")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--event-types", type=int, default=50)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    t0 = time.perf_counter()
+    et_ids = seed(Session, args.rows, args.event_types, args.days)
+    print(f"seeded {args.rows} bookings in {time.perf_counter() - t0:.1f}s")
+    with Session() as db:
+        print(f"bookings table now has {db.query(func.count(models.Booking.id)).scalar()} rows")
+
+    db = Session()
+    timings = []
+    found = 0
+    for _ in range(args.queries):
+        day = FIRST_DAY + timedelta(days=random.randrange(args.days))
+        t = time.perf_counter()
+        found += len(crud.get_active_booking_intervals(db, random.choice(et_ids), day, day + timedelta(days=1)))
+        timings.append((time.perf_counter() - t) * 1000)
+    db.close()
+
+    timings.sort()
+    print(f"{args.queries} day lookups, {found / args.queries:.1f} bookings/day on average")
+    print(f"  mean {statistics.mean(timings):.3f} ms")
+    print(f"  p50  {timings[len(timings) // 2]:.3f} ms")
+    print(f"  p95  {timings[int(len(timings) * 0.95)]:.3f} ms")
+    print(f"  p99  {timings[int(len(timings) * 0.99)]:.3f} ms")
+
+    print("plan:")
+    explain(engine, et_ids[0], FIRST_DAY, FIRST_DAY + timedelta(days=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local stand-in for Google Calendar.
+
+install() swaps the network calls of the sync and async Google clients
+for fakes that sleep for a configurable latency and answer freebusy with
+synthetic busy blocks. Everything above them (busy cache, metrics, slot
+filtering) runs unchanged, so benchmarks exercise the real code path.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytz
+
+from app.services import calendar_worker, google_calendar, google_calendar_async
+from app.services.google_calendar import DEFAULT_TIMEZONE
+
+_event_ids = count(1)
+
+
+class FakeGoogle:
+    def __init__(self, latency_ms: float = 80.0, jitter_ms: float = 20.0, busy_density: float = 0.3):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.busy_density = busy_density
+        self.calls = 0
+
+    def _delay(self) -> float:
+        return max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def busy(self, user_id: int, start_dt: datetime, end_dt: datetime) -> list:
+        """
+        Deterministic busy blocks: every half hour between 08:00 and 20:00 local
+        is busy with probability busy_density, seeded by host and day.
+        """
+        tz = pytz.timezone(DEFAULT_TIMEZONE)
+        start_local = start_dt.astimezone(tz) if start_dt.tzinfo else tz.localize(start_dt)
+        end_local = end_dt.astimezone(tz) if end_dt.tzinfo else tz.localize(end_dt)
+        busy = []
+        day = start_local.date()
+        while day <= end_local.date():
+            rng = random.Random(f"{user_id}:{day.isoformat()}")
+            for half_hour in range(16, 40):
+                if rng.random() < self.busy_density:
+                    block_start = tz.localize(datetime.combine(day, datetime.min.time()) + timedelta(minutes=30 * half_hour))
+                    busy.append({"start": block_start, "end": block_start + timedelta(minutes=30)})
+            day += timedelta(days=1)
+        return [b for b in busy if b["end"] > start_local and b["start"] < end_local]
+
+    # --- sync client ---
+    def fetch_busy_intervals(self, user, start_dt, end_dt):
+        self.calls += 1
+        time.sleep(self._delay())
+        return self.busy(user.id, start_dt, end_dt)
+
+    def create_event_for_booking(self, booking, event_type):
+        self.calls += 1
+        time.sleep(self._delay())
+        return f"fake-{next(_event_ids)}"
+
+    # --- async client ---
+    async def request(self, user, method: str, path: str, **kwargs) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        if path == "/freeBusy":
+            body = kwargs["json"]
+            busy = self.busy(
+                user.id, datetime.fromisoformat(body["timeMin"]), datetime.fromisoformat(body["timeMax"])
+            )
+            return {"calendars": {"primary": {"busy": [
+                {"start": b["start"].isoformat(), "end": b["end"].isoformat()} for b in busy
+            ]}}}
+        return {"id": f"fake-{next(_event_ids)}"}
+
+
+def install(latency_ms: float = 80.0, jitter_ms: float = 20.0, busy_density: float = 0.3) -> FakeGoogle:
+    fake = FakeGoogle(latency_ms, jitter_ms, busy_density)
+    google_calendar._fetch_busy_intervals = fake.fetch_busy_intervals
+    google_calendar.create_event_for_booking = fake.create_event_for_booking
+    calendar_worker.create_event_for_booking = fake.create_event_for_booking
+    google_calendar_async._request = fake.request
+    return fake
@@ -0,0 +1,174 @@
+"""
+End-to-end throughput/latency benchmark for the public endpoints.
+
+Seeds synthetic hosts, swaps Google for benchmarks.fake_google and drives
+the ASGI app in-process (httpx ASGITransport, no network) with concurrent
+slot, range and booking requests. Reports req/s and latency percentiles.
+
+    python -m benchmarks.http_load --url sqlite:///./bench.db --requests 2000 --concurrency 32
+    python -m benchmarks.http_load --workloads slots,book --latency-ms 150 --busy-density 0.5 --json before.json
+
+Any other setting (DB_ASYNC, BUSY_CACHE_ENABLED, BUSY_SOURCE, ...) is read
+from the environment as usual.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+WORKLOADS = ("slots", "range", "book")
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def pick_weekday(first_day: date, days: int) -> date:
+    while True:
+        day = first_day + timedelta(days=random.randrange(days))
+        if day.weekday() < 5:
+            return day
+
+
+def make_request(workload: str, event_types, first_day: date, days: int):
+    slug, duration = random.choice(event_types)
+    if workload == "slots":
+        return "GET", f"/public/{slug}/slots", {"params": {"date": pick_weekday(first_day, days).isoformat()}}
+    if workload == "range":
+        start = first_day + timedelta(days=random.randrange(max(1, days - 7)))
+        return "GET", f"/public/{slug}/slots/range", {
+            "params": {"from": start.isoformat(), "to": (start + timedelta(days=6)).isoformat()}
+        }
+    day = pick_weekday(first_day, days)
+    start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=9 * 60 + 15 * random.randrange(28))
+    return "POST", f"/public/{slug}/book", {"json": {
+        "start_datetime": start.isoformat(),
+        "end_datetime": (start + timedelta(minutes=duration)).isoformat(),
+        "invitee_name": "Load Test",
+        "invitee_email": "load@example.com",
+    }}
+
+
+async def run_workload(client, workload: str, requests: int, concurrency: int, event_types, first_day, days):
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            method, path, kwargs = make_request(workload, event_types, first_day, days)
+            t = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                statuses[response.status_code] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "workload": workload,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "req_per_s": round(requests / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p90_ms": round(percentile(latencies, 0.90), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+    }
+
+
+async def run(args, event_types, first_day):
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for workload in args.workloads:
+            if args.warmup:
+                await run_workload(client, workload, args.warmup, args.concurrency, event_types, first_day, args.days)
+            results.append(await run_workload(
+                client, workload, args.requests, args.concurrency, event_types, first_day, args.days
+            ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite:///./bench.db")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--requests", type=int, default=1000, help="per workload")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--hosts", type=int, default=50)
+    parser.add_argument("--event-types", type=int, default=3, help="per host")
+    parser.add_argument("--bookings", type=int, default=100, help="per event type")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="fake Google round-trip")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--busy-density", type=float, default=0.3, help="share of busy half-hours")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    random.seed(args.seed)
+
+    # Configure the app before it is imported; background threads would skew the numbers.
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("CALENDAR_WORKER_INPROCESS", "false")
+    os.environ.setdefault("TOKEN_REFRESHER_ENABLED", "false")
+    os.environ.setdefault("CALENDAR_SYNC_ENABLED", "false")
+    os.environ.setdefault("DB_POOL_SIZE", str(args.concurrency))
+
+    from sqlalchemy import select
+    import app.main  # noqa: F401  creates tables and runs migrations
+    from app import models
+    from app.db import SessionLocal
+    from benchmarks import fake_google
+    from benchmarks.seed import seed
+
+    fake = fake_google.install(args.latency_ms, args.jitter_ms, args.busy_density)
+    first_day = date.today() + timedelta(days=1)
+    t0 = time.perf_counter()
+    slugs = seed(SessionLocal, args.hosts, args.event_types, args.bookings, first_day, args.days)
+    with SessionLocal() as db:
+        event_types = db.execute(
+            select(models.EventType.slug, models.EventType.duration_minutes).where(models.EventType.slug.in_(slugs))
+        ).all()
+    print(f"seeded {len(event_types)} event types in {time.perf_counter() - t0:.1f}s")
+
+    results = asyncio.run(run(args, [tuple(et) for et in event_types], first_day))
+
+    print(f"{'workload':<8} {'req/s':>8} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  statuses")
+    for r in results:
+        print(
+            f"{r['workload']:<8} {r['req_per_s']:>8} {r['mean_ms']:>8} {r['p50_ms']:>8} "
+            f"{r['p90_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}  {r['statuses']}"
+        )
+    print(f"fake Google calls: {fake.calls}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json"}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
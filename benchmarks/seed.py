@@ -0,0 +1,121 @@
+"""
+Synthetic data for the benchmarks.
+
+    python -m benchmarks.seed --url sqlite:///./bench.db --hosts 100 --event-types 3 --bookings 200
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+
+DURATIONS = [15, 30, 45, 60]
+
+
+def seed(
+    Session,
+    hosts: int,
+    event_types_per_host: int,
+    bookings_per_event_type: int,
+    first_day: date,
+    days: int,
+) -> List[str]:
+    """
+    Creates hosts (marked as connected to Google), event types with
+    weekday rules and confirmed bookings inside those rules.
+    Returns the new event type slugs.
+    """
+    tag = uuid.uuid4().hex[:8]
+    db = Session()
+    try:
+        db.execute(insert(models.User), [
+            {"email": f"bench-{tag}-{h}@example.com", "google_access_token": "fake", "google_refresh_token": "fake"}
+            for h in range(hosts)
+        ])
+        user_ids = list(db.scalars(
+            select(models.User.id).where(models.User.email.like(f"bench-{tag}-%")).order_by(models.User.id)
+        ))
+
+        et_rows = []
+        for user_id in user_ids:
+            for i in range(event_types_per_host):
+                et_rows.append({
+                    "name": f"Bench {i}",
+                    "slug": f"bench-{tag}-{user_id}-{i}",
+                    "duration_minutes": random.choice(DURATIONS),
+                    "buffer_minutes": random.choice([0, 0, 5, 10]),
+                    "user_id": user_id,
+                    "version": 1,
+                })
+        db.execute(insert(models.EventType), et_rows)
+        event_types = db.execute(
+            select(models.EventType.id, models.EventType.slug, models.EventType.duration_minutes)
+            .where(models.EventType.slug.like(f"bench-{tag}-%"))
+        ).all()
+
+        rules = []
+        for et_id, _, _ in event_types:
+            for weekday in range(5):
+                if random.random() < 0.5:
+                    rules.append({"event_type_id": et_id, "weekday": weekday, "start_time": "09:00", "end_time": "17:00"})
+                else:
+                    rules.append({"event_type_id": et_id, "weekday": weekday, "start_time": "09:00", "end_time": "12:00"})
+                    rules.append({"event_type_id": et_id, "weekday": weekday, "start_time": "13:00", "end_time": "18:00"})
+        db.execute(insert(models.AvailabilityRule), rules)
+
+        bookings = []
+        for et_id, _, duration in event_types:
+            for n in range(bookings_per_event_type):
+                day = first_day + timedelta(days=random.randrange(days))
+                if day.weekday() >= 5:
+                    continue
+                start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=9 * 60 + 15 * random.randrange(28))
+                bookings.append({
+                    "event_type_id": et_id,
+                    "start_datetime": start,
+                    "end_datetime": start + timedelta(minutes=duration),
+                    "invitee_name": "Bench",
+                    "invitee_email": f"invitee{n}@example.com",
+                    "status": "confirmed",
+                })
+                if len(bookings) >= 10000:
+                    db.execute(insert(models.Booking), bookings)
+                    bookings = []
+        if bookings:
+            db.execute(insert(models.Booking), bookings)
+        db.commit()
+        return [slug for _, slug, _ in event_types]
+    finally:
+        db.close()
+
+
+def main():
+    from app.db import Base, make_engine
+    from app.migrations import run_migrations
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite:///./bench.db")
+    parser.add_argument("--hosts", type=int, default=100)
+    parser.add_argument("--event-types", type=int, default=3, help="per host")
+    parser.add_argument("--bookings", type=int, default=200, help="per event type")
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    t0 = time.perf_counter()
+    slugs = seed(Session, args.hosts, args.event_types, args.bookings, date.today(), args.days)
+    print(f"seeded {len(slugs)} event types in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
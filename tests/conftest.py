@@ -0,0 +1,112 @@
+"""
+Shared fixtures. The app runs against a private in-memory SQLite database
+with background workers off and Google calls stubbed out, so the suite
+needs no network and no configuration.
+"""
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta
+from itertools import count
+
+os.environ.update({
+    "DATABASE_URL": "sqlite://",
+    "SECRET_KEY": "test-secret",
+    "CALENDAR_WORKER_INPROCESS": "false",
+    "TOKEN_REFRESHER_ENABLED": "false",
+    "CALENDAR_SYNC_ENABLED": "false",
+    "BUSY_CACHE_ENABLED": "false",
+    "SLOT_MATERIALIZATION_ENABLED": "false",
+})
+
+import httpx
+import pytest
+
+from app import models
+from app.api.auth import create_access_token
+from app.db import SessionLocal
+from app.main import app
+from app.services import google_calendar, google_calendar_async
+
+_ids = count(1)
+
+
+@pytest.fixture(autouse=True)
+def no_google(monkeypatch):
+    """
+    Every host is free on Google and nothing leaves the process.
+    """
+    async def request(user, method, path, **kwargs):
+        if path == "/freeBusy":
+            return {"calendars": {"primary": {"busy": []}}}
+        return {"id": f"gcal-{next(_ids)}"}
+
+    monkeypatch.setattr(google_calendar_async, "_request", request)
+    monkeypatch.setattr(google_calendar, "_fetch_busy_intervals", lambda user, start, end: [])
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def next_monday() -> date:
+    today = date.today()
+    return today + timedelta(days=7 - today.weekday())
+
+
+@pytest.fixture
+def make_host(db):
+    """
+    make_host(event_types, rules, bookings) -> (user, [event types]): a host
+    connected to Google whose event types each have `rules` availability
+    rules and `bookings` confirmed bookings next Monday.
+    """
+    def make(event_types: int = 1, rules: int = 1, bookings: int = 0):
+        n = next(_ids)
+        user = models.User(email=f"host{n}@example.com", google_access_token="token")
+        db.add(user)
+        db.flush()
+        day = next_monday()
+        ets = []
+        for i in range(event_types):
+            et = models.EventType(
+                name=f"Meeting {i}", slug=f"host{n}-{i}", duration_minutes=15, user_id=user.id, version=1,
+            )
+            db.add(et)
+            db.flush()
+            for r in range(rules):
+                db.add(models.AvailabilityRule(
+                    event_type_id=et.id, weekday=r % 7, start_time=f"{8 + r // 7:02d}:00", end_time=f"{9 + r // 7:02d}:00",
+                ))
+            for b in range(bookings):
+                start = datetime.combine(day, time(8)) + timedelta(minutes=15 * b)
+                db.add(models.Booking(
+                    event_type_id=et.id, start_datetime=start, end_datetime=start + timedelta(minutes=15),
+                    invitee_name="Guest", invitee_email=f"guest{b}@example.com", status="confirmed",
+                ))
+            ets.append(et)
+        db.commit()
+        return user, ets
+
+    return make
+
+
+def auth_headers(user: models.User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+
+
+async def _request(method: str, url: str, **kwargs) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.request(method, url, **kwargs)
+
+
+def call(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    One request to the app, run in this thread so context variables
+    (e.g. db.count_queries) see everything the request does.
+    """
+    return asyncio.run(_request(method, url, **kwargs))
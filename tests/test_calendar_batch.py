@@ -0,0 +1,106 @@
+"""
+Calendar resync against a fake Google batch client.
+"""
+from datetime import datetime, timedelta
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app import models
+from app.services import calendar_batch
+
+
+class FakeEvents:
+    def insert(self, **kwargs):
+        return "insert", kwargs
+
+    def patch(self, **kwargs):
+        return "patch", kwargs
+
+    def delete(self, **kwargs):
+        return "delete", kwargs
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+
+class FakeClient:
+    def __init__(self):
+        self.service = self
+        self.sent = []
+        self.bodies = {}
+        self.existing = set()  # booking ids whose event Google already has
+
+    def events(self):
+        return FakeEvents()
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(callback)
+
+    def execute(self, batch):
+        for request_id, (action, kwargs) in batch.requests:
+            self.sent.append((action, int(request_id)))
+            self.bodies[int(request_id)] = kwargs.get("body")
+            if action == "insert" and int(request_id) in self.existing:
+                error = HttpError(httplib2.Response({"status": 409}), b"The requested identifier already exists.")
+                batch.callback(request_id, None, error)
+            else:
+                batch.callback(request_id, {"id": f"evt-{request_id}"}, None)
+
+
+@pytest.fixture
+def google(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(calendar_batch, "get_google_client", lambda user: client)
+    return client
+
+
+def _booking(db, et, status, job_status=None, minutes=0):
+    start = datetime(2030, 1, 7, 9) + timedelta(minutes=minutes)
+    booking = models.Booking(
+        event_type_id=et.id, start_datetime=start, end_datetime=start + timedelta(minutes=15),
+        invitee_name="Guest", invitee_email="guest@example.com", status=status,
+    )
+    db.add(booking)
+    db.flush()
+    if job_status is not None:
+        db.add(models.CalendarJob(booking_id=booking.id, status=job_status))
+    db.commit()
+    return booking
+
+
+def test_resync_creates_events_for_bookings_whose_job_failed(db, make_host, google):
+    user, (et,) = make_host()
+    failed = _booking(db, et, "pending", job_status="failed")
+    queued = _booking(db, et, "pending", job_status="pending", minutes=15)
+    running = _booking(db, et, "pending", job_status="running", minutes=30)
+    confirmed = _booking(db, et, "confirmed", minutes=45)
+
+    summary = calendar_batch.resync_user(user.id)
+
+    assert sorted(google.sent) == [("insert", failed.id), ("insert", confirmed.id)]
+    assert summary["created"] == 2 and summary["skipped"] == 2
+    db.expire_all()
+    assert (failed.status, failed.gcal_event_id) == ("confirmed", f"evt-{failed.id}")
+    assert (queued.status, queued.gcal_event_id) == ("pending", None)
+    assert (running.status, running.gcal_event_id) == ("pending", None)
+
+
+def test_resync_adopts_event_the_worker_already_created(db, make_host, google):
+    user, (et,) = make_host()
+    booking = _booking(db, et, "pending", job_status="failed")
+    google.existing.add(booking.id)
+
+    summary = calendar_batch.resync_user(user.id)
+
+    assert google.bodies[booking.id]["id"] == f"booking{booking.id}"
+    assert summary["created"] == 1 and summary["failed"] == 0
+    db.expire_all()
+    assert (booking.status, booking.gcal_event_id) == ("confirmed", f"booking{booking.id}")
@@ -0,0 +1,188 @@
+"""
+Busy mirror sync and watch channels against a stub events.list / events.watch.
+"""
+from datetime import datetime, timedelta
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app import config, models
+from app.services import calendar_sync
+
+from conftest import call
+
+SOON = datetime.utcnow().replace(microsecond=0) + timedelta(days=2)
+
+
+class FakeCalendar:
+    """
+    Answers events.list from `pages`, keyed by (syncToken, pageToken);
+    a value that is an exception is raised instead.
+    """
+
+    def __init__(self):
+        self.service = self
+        self.pages = {}
+        self.listed = []
+        self.watched = []
+        self.stopped = []
+
+    def events(self):
+        return self
+
+    def channels(self):
+        return self
+
+    def list(self, **params):
+        return "list", params
+
+    def watch(self, calendarId, body):
+        return "watch", body
+
+    def stop(self, body):
+        return "stop", body
+
+    def execute(self, request):
+        kind, params = request
+        if kind == "list":
+            self.listed.append(params)
+            result = self.pages[(params.get("syncToken"), params.get("pageToken"))]
+            if isinstance(result, Exception):
+                raise result
+            return result
+        if kind == "watch":
+            self.watched.append(params)
+            expires = datetime.utcnow() + timedelta(days=7)
+            return {"resourceId": f"resource-{params['id']}", "expiration": str(int(expires.timestamp() * 1000))}
+        self.stopped.append(params)
+        return {}
+
+
+def event(event_id: str, hours: int = 0, **extra) -> dict:
+    start = SOON + timedelta(hours=hours)
+    return {
+        "id": event_id,
+        "start": {"dateTime": start.isoformat() + "Z"},
+        "end": {"dateTime": (start + timedelta(hours=1)).isoformat() + "Z"},
+        **extra,
+    }
+
+
+@pytest.fixture
+def google(monkeypatch):
+    fake = FakeCalendar()
+    monkeypatch.setattr(calendar_sync, "get_google_client", lambda user: fake)
+    return fake
+
+
+@pytest.fixture
+def host(make_host):
+    user, _ = make_host()
+    return user
+
+
+def _blocks(db, user) -> dict:
+    db.expire_all()
+    return {
+        b.gcal_event_id: b.start_utc
+        for b in db.query(models.BusyBlock).filter(models.BusyBlock.user_id == user.id)
+    }
+
+
+def _state(db, user) -> models.CalendarSyncState:
+    db.expire_all()
+    return db.get(models.CalendarSyncState, user.id)
+
+
+def test_initial_full_sync_follows_pages(db, host, google):
+    google.pages[(None, None)] = {"items": [event("a")], "nextPageToken": "p2"}
+    google.pages[(None, "p2")] = {
+        "items": [event("b", hours=2), event("free", hours=4, transparency="transparent")],
+        "nextSyncToken": "s1",
+    }
+
+    assert calendar_sync.sync_user(host.id) == 3
+
+    assert _blocks(db, host) == {"a": SOON, "b": SOON + timedelta(hours=2)}
+    state = _state(db, host)
+    assert state.sync_token == "s1"
+    assert state.last_full_sync_at is not None and state.busy_changed_at is not None
+    assert [p.get("pageToken") for p in google.listed] == [None, "p2"]
+    assert all("syncToken" not in p for p in google.listed)
+
+
+def test_incremental_sync_applies_changes_with_sync_token(db, host, google):
+    google.pages[(None, None)] = {"items": [event("a"), event("b", hours=2)], "nextSyncToken": "s1"}
+    calendar_sync.sync_user(host.id)
+    full_sync_at = _state(db, host).last_full_sync_at
+
+    google.pages[("s1", None)] = {"items": [{"id": "a", "status": "cancelled"}], "nextPageToken": "p2"}
+    google.pages[("s1", "p2")] = {"items": [event("b", hours=3), event("c", hours=5)], "nextSyncToken": "s2"}
+    assert calendar_sync.sync_user(host.id) == 3
+
+    assert _blocks(db, host) == {"b": SOON + timedelta(hours=3), "c": SOON + timedelta(hours=5)}
+    state = _state(db, host)
+    assert state.sync_token == "s2"
+    assert state.last_full_sync_at == full_sync_at
+    assert [(p.get("syncToken"), p.get("pageToken")) for p in google.listed[1:]] == [("s1", None), ("s1", "p2")]
+
+
+def test_expired_sync_token_falls_back_to_full_sync(db, host, google):
+    google.pages[(None, None)] = {"items": [event("old")], "nextSyncToken": "s1"}
+    calendar_sync.sync_user(host.id)
+
+    google.pages[("s1", None)] = HttpError(httplib2.Response({"status": 410}), b"Sync token is no longer valid")
+    google.pages[(None, None)] = {"items": [event("new", hours=1)], "nextSyncToken": "s2"}
+    assert calendar_sync.sync_user(host.id) == 1
+
+    assert _blocks(db, host) == {"new": SOON + timedelta(hours=1)}
+    assert _state(db, host).sync_token == "s2"
+
+
+def test_other_errors_are_raised(db, host, google):
+    google.pages[(None, None)] = HttpError(httplib2.Response({"status": 500}), b"Backend error")
+    with pytest.raises(HttpError):
+        calendar_sync.sync_user(host.id)
+    assert _state(db, host) is None
+
+
+def test_watch_is_renewed_only_near_expiry(db, host, google, monkeypatch):
+    monkeypatch.setattr(config, "GOOGLE_WEBHOOK_URL", "https://example.com/webhooks/google/calendar")
+    margin = timedelta(seconds=config.CALENDAR_WATCH_RENEW_MARGIN_SECONDS)
+
+    assert calendar_sync.ensure_watch(host.id) is True
+    first = _state(db, host)
+    assert google.watched[0]["address"] == config.GOOGLE_WEBHOOK_URL
+    assert google.watched[0]["token"] == first.channel_token
+    assert first.channel_expires_at > datetime.utcnow() + margin
+
+    # Far from expiry: left alone
+    assert calendar_sync.ensure_watch(host.id) is False
+    assert len(google.watched) == 1
+
+    # Inside the renewal margin: old channel stopped, new one opened
+    first.channel_expires_at = datetime.utcnow() + margin - timedelta(minutes=5)
+    old_channel, old_resource = first.channel_id, first.channel_resource_id
+    db.commit()
+    assert calendar_sync.ensure_watch(host.id) is True
+    assert google.stopped == [{"id": old_channel, "resourceId": old_resource}]
+    renewed = _state(db, host)
+    assert renewed.channel_id != old_channel
+    assert renewed.channel_expires_at > datetime.utcnow() + margin
+
+
+def test_webhook_checks_channel_token(db, host, google, monkeypatch):
+    monkeypatch.setattr(config, "GOOGLE_WEBHOOK_URL", "https://example.com/webhooks/google/calendar")
+    calendar_sync.ensure_watch(host.id)
+    state = _state(db, host)
+    headers = {"X-Goog-Channel-ID": state.channel_id, "X-Goog-Resource-State": "sync"}
+
+    assert calendar_sync.user_for_channel(db, state.channel_id, state.channel_token) == host.id
+    assert calendar_sync.user_for_channel(db, state.channel_id, "wrong") is None
+    assert calendar_sync.user_for_channel(db, state.channel_id, None) is None
+
+    assert call("POST", "/webhooks/google/calendar", headers={**headers, "X-Goog-Channel-Token": "wrong"}).status_code == 404
+    assert call("POST", "/webhooks/google/calendar", headers=headers).status_code == 404
+    ok = call("POST", "/webhooks/google/calendar", headers={**headers, "X-Goog-Channel-Token": state.channel_token})
+    assert ok.status_code == 200
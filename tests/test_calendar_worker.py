@@ -0,0 +1,78 @@
+"""
+Calendar outbox jobs against a stub events.insert.
+"""
+from datetime import datetime, timedelta
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app import models
+from app.services import calendar_worker, google_calendar
+
+
+class FakeCalendar:
+    """
+    Keeps inserted events by id. lose_response makes the next insert succeed
+    on Google's side but fail on ours, like a timeout after the write.
+    """
+
+    def __init__(self):
+        self.service = self
+        self.events_by_id = {}
+        self.inserted_ids = []
+        self.lose_response = False
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body, **kwargs):
+        return body
+
+    def execute(self, body):
+        self.inserted_ids.append(body["id"])
+        if body["id"] in self.events_by_id:
+            raise HttpError(httplib2.Response({"status": 409}), b"The requested identifier already exists.")
+        self.events_by_id[body["id"]] = body
+        if self.lose_response:
+            self.lose_response = False
+            raise TimeoutError("timed out")
+        return {"id": body["id"]}
+
+
+@pytest.fixture
+def google(monkeypatch):
+    calendar = FakeCalendar()
+    monkeypatch.setattr(google_calendar, "get_google_client", lambda user: calendar)
+    return calendar
+
+
+def _job(db, et):
+    start = datetime(2030, 1, 7, 9)
+    booking = models.Booking(
+        event_type_id=et.id, start_datetime=start, end_datetime=start + timedelta(minutes=15),
+        invitee_name="Guest", invitee_email="guest@example.com", status="pending",
+    )
+    db.add(booking)
+    db.flush()
+    job = models.CalendarJob(booking_id=booking.id, status="running")
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_retry_after_lost_response_does_not_duplicate_event(db, make_host, google):
+    _, (et,) = make_host()
+    job = _job(db, et)
+    google.lose_response = True
+
+    calendar_worker.run_job(db, job)
+    assert job.status == "pending" and job.attempts == 1
+
+    calendar_worker.run_job(db, job)
+    booking = job.booking
+    event_id = google_calendar.booking_event_id(booking)
+    assert job.status == "done"
+    assert (booking.status, booking.gcal_event_id) == ("confirmed", event_id)
+    assert google.inserted_ids == [event_id, event_id]
+    assert list(google.events_by_id) == [event_id]
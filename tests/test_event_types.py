@@ -0,0 +1,23 @@
+"""
+Event type edits and their schedule version.
+"""
+from app import crud, models
+from app.db import SessionLocal
+
+
+def test_concurrent_edits_each_bump_the_version(db, make_host):
+    _, (et,) = make_host()
+    other = SessionLocal()
+    try:
+        # Both sessions loaded version 1 before either committed
+        stale = other.get(models.EventType, et.id)
+        assert (et.version, stale.version) == (1, 1)
+        crud.bump_event_type_version(et)
+        crud.bump_event_type_version(stale)
+        db.commit()
+        other.commit()
+    finally:
+        other.close()
+
+    db.refresh(et)
+    assert et.version == 3
@@ -0,0 +1,116 @@
+"""
+Background token refresh: which hosts it touches, failure backoff and the client pool.
+"""
+from datetime import datetime, timedelta
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from app import models
+from app.services import google_tokens
+from app.services.google_clients import client_pool
+
+_ids = count(1)
+
+
+@pytest.fixture
+def refresh(monkeypatch):
+    """
+    Replaces the token endpoint; fail.add(user_id) makes that host's refresh raise.
+    """
+    calls = []
+    fail = set()
+
+    def fake_refresh(creds, request):
+        user_id = int(creds.refresh_token.split("-")[1])
+        calls.append(user_id)
+        if user_id in fail:
+            raise Exception("invalid_grant")
+        creds.token = f"fresh-{user_id}"
+        creds.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", fake_refresh)
+    return SimpleNamespace(calls=calls, fail=fail)
+
+
+@pytest.fixture
+def host(db):
+    def make(last_used=timedelta(minutes=5), expires_in=timedelta(seconds=30)):
+        now = datetime.utcnow()
+        user = models.User(
+            email=f"token{next(_ids)}@example.com",
+            google_access_token="stale",
+            google_token_expiry=now + expires_in,
+            google_last_used_at=None if last_used is None else now - last_used,
+        )
+        db.add(user)
+        db.flush()
+        user.google_refresh_token = f"refresh-{user.id}"
+        db.commit()
+        return user
+    return make
+
+
+def test_refreshes_only_active_expiring_hosts(db, host, refresh):
+    active = host()
+    idle = host(last_used=timedelta(days=30))
+    never_used = host(last_used=None)
+    fresh = host(expires_in=timedelta(hours=1))
+
+    assert google_tokens.refresh_expiring_tokens() == 1
+    assert refresh.calls == [active.id]
+    db.refresh(active)
+    assert active.google_access_token == f"fresh-{active.id}"
+    for user in (idle, never_used, fresh):
+        db.refresh(user)
+        assert user.google_access_token == "stale"
+
+
+def test_failed_refresh_backs_off(db, host, refresh):
+    user = host()
+    refresh.fail.add(user.id)
+
+    assert google_tokens.refresh_expiring_tokens() == 0
+    db.refresh(user)
+    assert user.google_refresh_failures == 1
+    assert user.google_refresh_retry_at > datetime.utcnow()
+
+    # Still backing off: not retried on the next tick
+    google_tokens.refresh_expiring_tokens()
+    assert refresh.calls == [user.id]
+
+    # Once the delay is over it is retried, and success clears the count
+    user.google_refresh_retry_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    refresh.fail.clear()
+    assert google_tokens.refresh_expiring_tokens() == 1
+    db.refresh(user)
+    assert user.google_refresh_failures == 0
+    assert user.google_refresh_retry_at is None
+
+
+def test_updates_cached_client_without_building_others(db, host, refresh, monkeypatch):
+    cached, uncached = host(), host()
+    pooled = SimpleNamespace(
+        creds=google_tokens.make_credentials(cached), last_used=float("inf"),
+    )
+    monkeypatch.setitem(client_pool._clients, cached.id, pooled)
+    monkeypatch.setattr(client_pool, "get", lambda user: pytest.fail("built a pooled client"))
+
+    assert google_tokens.refresh_expiring_tokens() == 2
+    assert pooled.creds.token == f"fresh-{cached.id}"
+    assert uncached.id not in client_pool._clients
+
+
+def test_google_use_is_recorded_at_most_every_interval(db, host):
+    user = host(last_used=None)
+    google_tokens.note_google_use(user)
+    first = user.google_last_used_at
+    assert first is not None
+    assert not google_tokens.google_use_due(user)
+
+    google_tokens.note_google_use(user)
+    db.refresh(user)
+    assert user.google_last_used_at == first
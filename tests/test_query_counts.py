@@ -0,0 +1,77 @@
+"""
+The number of SQL statements per request must not grow with the number
+of event types, rules or bookings involved.
+"""
+from datetime import timedelta
+
+import pytest
+
+from app.db import count_queries
+
+from conftest import auth_headers, call, next_monday
+
+SIZES = (1, 10)
+
+
+def _counts(make_host, request_for) -> dict:
+    """
+    Query count of the request built by request_for(user, event_types)
+    for hosts with 1 and with 10 event types, rules and bookings.
+    """
+    counts = {}
+    for n in SIZES:
+        user, ets = make_host(event_types=n, rules=n, bookings=n)
+        url, headers = request_for(user, ets)
+        with count_queries() as counter:
+            response = call("GET", url, headers=headers)
+        assert response.status_code == 200, response.text
+        counts[n] = counter.count
+    return counts
+
+
+def test_event_type_list_query_count(make_host):
+    counts = _counts(make_host, lambda user, ets: ("/event-types/", auth_headers(user)))
+    assert counts[1] == counts[10], counts
+
+
+def test_public_details_query_count(make_host):
+    counts = _counts(make_host, lambda user, ets: (f"/public/{ets[-1].slug}/details", {}))
+    assert counts[1] == counts[10], counts
+
+
+@pytest.mark.parametrize("query", ["slots?date={first}", "slots/range?from={first}&to={last}"])
+def test_public_slots_query_count(make_host, query):
+    first = next_monday()
+    path = query.format(first=first, last=first + timedelta(days=6))
+    counts = _counts(make_host, lambda user, ets: (f"/public/{ets[-1].slug}/{path}", {}))
+    assert counts[1] == counts[10], counts
+
+
+def _rules(n: int, first_start: str = "08:00") -> list:
+    rules = [
+        {"weekday": i % 7, "start_time": f"{8 + 2 * (i // 7):02d}:00", "end_time": f"{9 + 2 * (i // 7):02d}:00"}
+        for i in range(n)
+    ]
+    rules[0]["start_time"] = first_start
+    return rules
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH"])
+def test_availability_save_query_count(make_host, method):
+    created, changed = {}, {}
+    for n in SIZES:
+        user, (et,) = make_host(rules=0)
+        url = f"/event-types/{et.id}/availability"
+        with count_queries() as counter:
+            response = call(method, url, json=_rules(n))
+        assert response.status_code == 200, response.text
+        assert len(response.json()) == n
+        created[n] = counter.count
+
+        with count_queries() as counter:
+            response = call(method, url, json=_rules(n, first_start="08:30"))
+        assert response.status_code == 200, response.text
+        assert response.json()[0]["start_time"] == "08:30"
+        changed[n] = counter.count
+    assert created[1] == created[10], created
+    assert changed[1] == changed[10], changed
@@ -0,0 +1,26 @@
+"""
+Availability rule validation and merging.
+"""
+import pytest
+
+from app.schemas import AvailabilityRuleCreate
+from app.services.schedule import normalize_rules
+
+
+def _rules(*ranges):
+    return [AvailabilityRuleCreate(weekday=0, start_time=start, end_time=end) for start, end in ranges]
+
+
+def test_overlapping_ranges_are_merged():
+    assert normalize_rules(_rules(("09:00", "11:00"), ("10:00", "12:00"))) == [(0, "09:00", "12:00")]
+
+
+def test_touching_ranges_stay_separate():
+    assert normalize_rules(_rules(("10:00", "10:50"), ("09:00", "10:00"))) == [
+        (0, "09:00", "10:00"), (0, "10:00", "10:50"),
+    ]
+
+
+def test_invalid_range_is_rejected():
+    with pytest.raises(ValueError):
+        normalize_rules(_rules(("10:00", "09:00")))
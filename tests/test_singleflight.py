@@ -0,0 +1,172 @@
+"""
+Concurrent identical calls through SingleFlight / AsyncSingleFlight share one execution.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import config
+from app.services.singleflight import AsyncSingleFlight, SingleFlight
+
+N = 20
+
+
+class SlowFake:
+    """
+    Counts executions and blocks until released, so every caller arrives
+    while the first one is still in flight.
+    """
+
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.error = error
+        self.release = threading.Event()
+
+    def __call__(self, value):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {"value": value}
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _run_threads(flights: SingleFlight, fake: SlowFake) -> list:
+    outcomes = [None] * N
+
+    def worker(i):
+        try:
+            outcomes[i] = flights.do("key", fake, "x")
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(N)]
+    for t in threads:
+        t.start()
+    _wait_for(lambda: flights.shared == N - 1)
+    fake.release.set()
+    for t in threads:
+        t.join(5)
+    return outcomes
+
+
+def test_sync_calls_share_one_execution():
+    flights, fake = SingleFlight("test"), SlowFake()
+    outcomes = _run_threads(flights, fake)
+
+    assert fake.calls == 1
+    assert all(o is outcomes[0] for o in outcomes) and outcomes[0] == {"value": "x"}
+    assert flights.stats() == {"calls": 1, "shared": N - 1, "in_flight": 0}
+
+    # Nothing is kept: the next call runs again
+    assert flights.do("key", fake, "y") == {"value": "y"}
+    assert fake.calls == 2
+
+
+def test_sync_exception_reaches_every_waiter():
+    error = RuntimeError("boom")
+    flights, fake = SingleFlight("test"), SlowFake(error)
+    outcomes = _run_threads(flights, fake)
+
+    assert fake.calls == 1
+    assert all(o is error for o in outcomes)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_sync_different_keys_run_separately():
+    flights, fake = SingleFlight("test"), SlowFake()
+    fake.release.set()
+    assert flights.do("a", fake, 1) == {"value": 1}
+    assert flights.do("b", fake, 2) == {"value": 2}
+    assert fake.calls == 2
+
+
+def test_disabled_runs_every_call(monkeypatch):
+    monkeypatch.setattr(config, "SINGLEFLIGHT_ENABLED", False)
+    flights, fake = SingleFlight("test"), SlowFake()
+    fake.release.set()
+    flights.do("key", fake, 1)
+    flights.do("key", fake, 1)
+    assert fake.calls == 2 and flights.stats()["calls"] == 0
+
+
+class AsyncSlowFake:
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self, value):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {"value": value}
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_async_calls_share_one_execution():
+    async def main():
+        flights, fake = AsyncSingleFlight("test"), AsyncSlowFake()
+        callers = [asyncio.ensure_future(flights.do("key", fake, "x")) for _ in range(N)]
+        await _settle()
+        assert flights.stats() == {"calls": 1, "shared": N - 1, "in_flight": 1}
+        fake.release.set()
+        results = await asyncio.gather(*callers)
+
+        assert fake.calls == 1
+        assert all(r is results[0] for r in results) and results[0] == {"value": "x"}
+        assert flights.stats()["in_flight"] == 0
+        assert await flights.do("key", fake, "y") == {"value": "y"}
+        assert fake.calls == 2
+
+    asyncio.run(main())
+
+
+def test_async_exception_reaches_every_waiter():
+    async def main():
+        error = RuntimeError("boom")
+        flights, fake = AsyncSingleFlight("test"), AsyncSlowFake(error)
+        callers = [asyncio.ensure_future(flights.do("key", fake, "x")) for _ in range(N)]
+        await _settle()
+        fake.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        assert fake.calls == 1
+        assert all(r is error for r in results)
+        assert flights.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("cancelled", ["leader", "waiter"])
+def test_async_cancelling_a_caller_does_not_cancel_the_work(cancelled):
+    async def main():
+        flights, fake = AsyncSingleFlight("test"), AsyncSlowFake()
+        leader = asyncio.ensure_future(flights.do("key", fake, "x"))
+        waiter = asyncio.ensure_future(flights.do("key", fake, "x"))
+        await _settle()
+
+        gone, remaining = (leader, waiter) if cancelled == "leader" else (waiter, leader)
+        gone.cancel()
+        await _settle()
+        assert gone.cancelled()
+
+        fake.release.set()
+        assert await remaining == {"value": "x"}
+        assert fake.calls == 1
+        assert flights.stats()["in_flight"] == 0
+
+    asyncio.run(main())
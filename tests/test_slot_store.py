@@ -0,0 +1,48 @@
+"""
+Materialized slot days: what gets stored, and what must not be.
+"""
+import pytest
+
+from app import crud, models
+from app.services import google_calendar, slot_store
+from conftest import next_monday
+
+
+def _stored_days(db, event_type_id):
+    return db.query(models.SlotDay).filter(models.SlotDay.event_type_id == event_type_id).all()
+
+
+def test_deleting_event_type_drops_its_stored_days(db, make_host):
+    user, (et,) = make_host()
+    slot_store.refresh_days(db, et, [next_monday()])
+    et_id = et.id
+    assert len(_stored_days(db, et_id)) == 1
+
+    crud.delete_event_type(db, et)
+
+    assert _stored_days(db, et_id) == []
+    # SQLite hands the freed id to the next event type
+    reused = models.EventType(name="New", slug=f"new-{et_id}", duration_minutes=15, user_id=user.id, version=1)
+    db.add(reused)
+    db.commit()
+    assert reused.id == et_id
+    assert crud.get_slot_days(db, reused.slug, next_monday(), next_monday()) == []
+
+
+def test_google_failure_leaves_day_dirty(db, make_host, monkeypatch):
+    _, (et,) = make_host()
+    day = next_monday()
+
+    def unreachable(user, start, end):
+        raise ConnectionError("Google unreachable")
+
+    monkeypatch.setattr(google_calendar, "_fetch_busy_intervals", unreachable)
+    with pytest.raises(ConnectionError):
+        slot_store.refresh_days(db, et, [day])
+
+    db.expire_all()
+    (row,) = _stored_days(db, et.id)
+    assert row.is_dirty and row.computed_at is None
+    assert slot_store.servable_days([(row, et.version)], day, day) is None
+    # Live reads still degrade to "no busy time"
+    assert google_calendar.get_busy_intervals(et.owner, day, day) == []
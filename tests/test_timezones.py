@@ -0,0 +1,139 @@
+"""
+Zone changes keep bookings at their instants; naive slots stay unambiguous across DST.
+"""
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app import config, models
+from app.services import slot_store
+from app.services.slot_engine import numpy_enabled
+
+from conftest import auth_headers, call
+
+# Almaty is UTC+5; Berlin is UTC+1 in January
+WINTER_MONDAY = date(2030, 1, 7)
+# Clocks go back from 02:00 EDT to 01:00 EST
+NY_FALL_BACK = date(2030, 11, 3)
+
+
+def _booking(db, et, start: datetime, minutes: int = 30) -> models.Booking:
+    booking = models.Booking(
+        event_type_id=et.id, start_datetime=start, end_datetime=start + timedelta(minutes=minutes),
+        invitee_name="Guest", invitee_email="guest@example.com", status="confirmed",
+    )
+    db.add(booking)
+    db.commit()
+    return booking
+
+
+def _stored(db, booking) -> tuple:
+    db.expire_all()
+    row = db.get(models.Booking, booking.id)
+    return row.start_datetime, row.end_datetime
+
+
+def _slot_starts(slug: str, day: date) -> list:
+    response = call("GET", f"/public/{slug}/slots", params={"date": day.isoformat()})
+    assert response.status_code == 200, response.text
+    return [s["start"] for s in response.json()]
+
+
+def test_host_zone_change_keeps_booking_instants(db, make_host, monkeypatch):
+    monkeypatch.setattr(config, "DEFAULT_TIMEZONE", "Asia/Almaty")
+    user, (inherits, own) = make_host(event_types=2, rules=0)
+    own.timezone = "Asia/Tokyo"
+    for et in (inherits, own):
+        db.add(models.AvailabilityRule(event_type_id=et.id, weekday=0, start_time="04:00", end_time="10:00"))
+    db.commit()
+    user.timezone = "Asia/Almaty"
+    db.commit()
+    booked = _booking(db, inherits, datetime.combine(WINTER_MONDAY, time(9)))
+    untouched = _booking(db, own, datetime.combine(WINTER_MONDAY, time(9)))
+
+    response = call("PATCH", "/auth/me", json={"timezone": "Europe/Berlin"}, headers=auth_headers(user))
+    assert response.status_code == 200, response.text
+
+    # 09:00 Almaty is 04:00 UTC, i.e. 05:00 Berlin
+    assert _stored(db, booked) == (datetime(2030, 1, 7, 5), datetime(2030, 1, 7, 5, 30))
+    assert _stored(db, untouched) == (datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 9, 30))
+
+    starts = _slot_starts(inherits.slug, WINTER_MONDAY)
+    assert "2030-01-07T05:00:00" not in starts
+    assert "2030-01-07T09:00:00" in starts
+
+
+@pytest.mark.parametrize("method", ["PUT", "PATCH"])
+def test_event_type_zone_change_keeps_booking_instants(db, make_host, method):
+    user, (et,) = make_host(rules=0)
+    et.timezone = "Asia/Almaty"
+    db.commit()
+    booked = _booking(db, et, datetime.combine(WINTER_MONDAY, time(9)))
+
+    response = call(method, f"/event-types/{et.id}", json={"timezone": "Europe/Berlin"})
+    assert response.status_code == 200, response.text
+    assert _stored(db, booked) == (datetime(2030, 1, 7, 5), datetime(2030, 1, 7, 5, 30))
+
+    # Other fields leave bookings alone
+    response = call(method, f"/event-types/{et.id}", json={"name": "Renamed"})
+    assert response.status_code == 200, response.text
+    assert _stored(db, booked) == (datetime(2030, 1, 7, 5), datetime(2030, 1, 7, 5, 30))
+
+
+@pytest.fixture
+def fall_back_event_type(db, make_host):
+    user, (et,) = make_host(rules=0)
+    et.timezone = "America/New_York"
+    et.duration_minutes = 30
+    db.add(models.AvailabilityRule(event_type_id=et.id, weekday=6, start_time="00:00", end_time="04:00"))
+    db.commit()
+    return et
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+def test_naive_slots_on_fall_back_day_are_bookable(fall_back_event_type, monkeypatch, engine):
+    monkeypatch.setattr(config, "SLOT_ENGINE_NUMPY", engine == "numpy")
+    if engine == "numpy" and not numpy_enabled():
+        pytest.skip("numpy is not installed")
+    slug = fall_back_event_type.slug
+    response = call("GET", f"/public/{slug}/slots", params={"date": NY_FALL_BACK.isoformat()})
+    slots = response.json()
+
+    starts = [s["start"] for s in slots]
+    assert len(starts) == len(set(starts))
+    assert all(s["end"] > s["start"] for s in slots)
+    # 01:30 EDT ends at 01:00 EST; the repeated hour itself is left out
+    assert "2030-11-03T01:00:00" in starts and "2030-11-03T01:30:00" not in starts
+
+    assert len(starts) == 7
+
+    for slot in slots:
+        booking = {
+            "start_datetime": slot["start"], "end_datetime": slot["end"],
+            "invitee_name": "Guest", "invitee_email": "guest@example.com",
+        }
+        response = call("POST", f"/public/{slug}/book", json=booking)
+        assert response.status_code == 200, (slot, response.text)
+
+    # With an offset the dropped slot is unambiguous, and it is still free
+    aware = call("GET", f"/public/{slug}/slots", params={"date": NY_FALL_BACK.isoformat(), "tz": "UTC"}).json()
+    assert aware == [{"start": "2030-11-03T05:30:00Z", "end": "2030-11-03T06:00:00Z"}]
+
+
+def test_materialized_fall_back_day_matches_live(db, fall_back_event_type):
+    et = fall_back_event_type
+    live = call("GET", f"/public/{et.slug}/slots", params={"date": NY_FALL_BACK.isoformat()}).text
+
+    slot_store.refresh_days(db, et, [NY_FALL_BACK])
+    db.expire_all()
+    row = db.get(models.SlotDay, (et.id, NY_FALL_BACK))
+    assert slot_store.render_stored(row) == live
+
+
+@pytest.mark.parametrize("value", [5, ["Europe/Berlin"], "Mars/Olympus"])
+def test_patch_rejects_invalid_zone(db, make_host, value):
+    _, (et,) = make_host(rules=0)
+    response = call("PATCH", f"/event-types/{et.id}", json={"timezone": value})
+    assert response.status_code == 422, response.text
+    db.refresh(et)
+    assert et.timezone is None